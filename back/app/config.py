@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 from typing import Optional
 
 
@@ -36,8 +37,9 @@ def _as_float(value: Optional[str], default: float) -> float:
         return default
 
 
+@lru_cache(maxsize=1)
 def is_running_in_docker() -> bool:
-    """Detect container runtime via well-known markers."""
+    """Detect container runtime via well-known markers (cached per process)."""
     try:
         return os.path.exists("/.dockerenv") or os.getenv("RUNNING_IN_DOCKER") == "1"
     except Exception:
@@ -82,6 +84,9 @@ LLM_TEMPERATURE: float = _as_float(_raw_llm_temperature, 0.2)
 _raw_llm_timeout_s = os.getenv("LLM_TIMEOUT_S")
 LLM_TIMEOUT_S: float = _as_float(_raw_llm_timeout_s, 60.0)
 
+_raw_llm_max_concurrency = os.getenv("LLM_MAX_CONCURRENCY")
+LLM_MAX_CONCURRENCY: int = _as_int(_raw_llm_max_concurrency, 8)
+
 # AI Report specific LLM overrides (falls back to global LLM_* when unset)
 _raw_report_llm_provider = os.getenv("AI_REPORT_LLM_PROVIDER")
 AI_REPORT_LLM_PROVIDER: str = _clean_str(_raw_report_llm_provider, LLM_PROVIDER)
@@ -91,6 +96,11 @@ AI_REPORT_LLM_ENDPOINT: str = _clean_str(
     _raw_report_llm_endpoint, LLM_ENDPOINT
 ).rstrip("/")
 
+# True when an endpoint was configured explicitly (not the built-in default)
+AI_REPORT_LLM_ENDPOINT_EXPLICIT: bool = bool(
+    _clean_str(_raw_report_llm_endpoint) or _clean_str(_raw_llm_endpoint)
+)
+
 _raw_report_llm_model = os.getenv("AI_REPORT_LLM_MODEL")
 AI_REPORT_LLM_MODEL: str = _clean_str(_raw_report_llm_model, LLM_MODEL)
 
@@ -112,15 +122,62 @@ AI_REPORT_LLM_TIMEOUT_S: float = _as_float(
     _raw_report_llm_timeout_s, LLM_TIMEOUT_S
 )
 
+# Optional on-disk cache of deterministic (temperature 0) report LLM replies
+_raw_ai_report_cache_dir = os.getenv("AI_REPORT_CACHE_DIR")
+AI_REPORT_CACHE_DIR: str = _clean_str(_raw_ai_report_cache_dir, "")
+
+# Seconds an on-disk LLM reply stays valid, and max files kept in the cache dir
+_raw_ai_report_cache_ttl = os.getenv("AI_REPORT_CACHE_TTL")
+AI_REPORT_CACHE_TTL: float = _as_float(_raw_ai_report_cache_ttl, 7 * 24 * 3600.0)
+
+_raw_ai_report_cache_max_files = os.getenv("AI_REPORT_CACHE_MAX_FILES")
+AI_REPORT_CACHE_MAX_FILES: int = _as_int(_raw_ai_report_cache_max_files, 1000)
+
+# Max concurrent report generations in flight (bounds LLM load)
+_raw_ai_report_concurrency = os.getenv("AI_REPORT_CONCURRENCY")
+AI_REPORT_CONCURRENCY: int = _as_int(_raw_ai_report_concurrency, 4)
+
+# Seconds a collected widget bundle is reused by later reports (0 disables)
+_raw_ai_report_bundle_ttl = os.getenv("AI_REPORT_BUNDLE_TTL")
+AI_REPORT_BUNDLE_TTL: float = _as_float(_raw_ai_report_bundle_ttl, 60.0)
+
+# Seconds a finished LLM report is reused for an identical request (0 disables)
+_raw_ai_report_result_ttl = os.getenv("AI_REPORT_RESULT_TTL")
+AI_REPORT_RESULT_TTL: float = _as_float(_raw_ai_report_result_ttl, 300.0)
+
+# Byte budget for the widget bundle embedded in the report prompt
+_raw_ai_report_prompt_max_bytes = os.getenv("AI_REPORT_PROMPT_MAX_BYTES")
+AI_REPORT_PROMPT_MAX_BYTES: int = _as_int(_raw_ai_report_prompt_max_bytes, 48_000)
+
 # AI cache knobs
 _raw_ai_insights_cache_ttl = os.getenv("AI_INSIGHTS_CACHE_TTL")
 AI_INSIGHTS_CACHE_TTL: float = _as_float(_raw_ai_insights_cache_ttl, 60.0)
 
+_raw_ai_insights_cache_max = os.getenv("AI_INSIGHTS_CACHE_MAX")
+AI_INSIGHTS_CACHE_MAX: int = _as_int(_raw_ai_insights_cache_max, 2048)
+
+# Optional shared cache (L2) for multi-worker deployments; empty = in-process only
+_raw_redis_url = os.getenv("REDIS_URL")
+REDIS_URL: str = _clean_str(_raw_redis_url, "")
+
 _raw_ai_insights_explain_cache_ttl = os.getenv("AI_INSIGHTS_EXPLAIN_CACHE_TTL")
 AI_INSIGHTS_EXPLAIN_CACHE_TTL: int = _as_int(
     _raw_ai_insights_explain_cache_ttl, 300
 )
 
+# AI insights prompt compaction (Ollama)
+_raw_ai_insights_max_series_points = os.getenv("AI_INSIGHTS_MAX_SERIES_POINTS")
+AI_INSIGHTS_MAX_SERIES_POINTS: int = _as_int(
+    _raw_ai_insights_max_series_points, 40
+)
+
+_raw_ai_insights_top_paths = os.getenv("AI_INSIGHTS_TOP_PATHS")
+AI_INSIGHTS_TOP_PATHS: int = _as_int(_raw_ai_insights_top_paths, 10)
+
+# Shared worker pool for digest aggregation queries
+_raw_ai_insights_pool = os.getenv("AI_INSIGHTS_POOL")
+AI_INSIGHTS_POOL: int = _as_int(_raw_ai_insights_pool, 8)
+
 
 # AI report internal fetch endpoint
 _raw_ai_report_fetch_base = os.getenv("AI_REPORT_FETCH_BASE")
@@ -2,20 +2,111 @@
 수집 관련 엔드포인트를 제공하는 라우터입니다.
 """
 
-from typing import Any, Dict
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
 
+import orjson
 from fastapi import APIRouter, Request
 
 from .influx import write_events
 
 
+log = logging.getLogger("ingest")
+
 router = APIRouter(prefix="/api/ingest", tags=["ingest"])
 
+# NDJSON bodies are written in micro-batches of this many events / bytes.
+# NDJSON 본문은 이벤트 수 또는 바이트 기준의 작은 배치 단위로 기록합니다.
+NDJSON_BATCH_EVENTS = 40
+NDJSON_BATCH_BYTES = 64 * 1024
+# A single NDJSON line may not exceed this; longer lines are rejected unparsed.
+# 한 줄이 이 크기를 넘으면 파싱하지 않고 버립니다.
+NDJSON_MAX_LINE_BYTES = 1024 * 1024
+
+
+def _parse_event(line: bytes) -> Optional[Dict[str, Any]]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        event = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+async def _iter_ndjson_batches(req: Request, counts: Dict[str, int]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield event batches while the NDJSON body is still streaming in.
+    요청 본문을 끝까지 읽기 전에 줄 단위로 파싱하여 배치를 넘깁니다.
+
+    Lines that are not a JSON object, or are longer than NDJSON_MAX_LINE_BYTES,
+    are skipped and tallied in counts["rejected"].
+    """
+    buf = bytearray()
+    # Inside an overlong line: drop bytes until its newline shows up
+    skipping = False
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    async for chunk in req.stream():
+        if skipping:
+            nl = chunk.find(b"\n")
+            if nl == -1:
+                continue
+            skipping = False
+            chunk = chunk[nl + 1:]
+        # Only the newly arrived bytes can hold a newline not seen yet
+        scan = len(buf)
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", scan)) != -1:
+            line = buf[start:nl]
+            start = scan = nl + 1
+            if len(line) > NDJSON_MAX_LINE_BYTES:
+                counts["rejected"] += 1
+                continue
+            event = _parse_event(line)
+            if event is None:
+                if line.strip():
+                    # Skip malformed lines instead of dropping the whole push
+                    counts["rejected"] += 1
+                continue
+            batch.append(event)
+            batch_bytes += len(line)
+            if len(batch) >= NDJSON_BATCH_EVENTS or batch_bytes >= NDJSON_BATCH_BYTES:
+                yield batch
+                batch, batch_bytes = [], 0
+        del buf[:start]
+        if len(buf) > NDJSON_MAX_LINE_BYTES:
+            counts["rejected"] += 1
+            buf.clear()
+            skipping = True
+    if not skipping and buf.strip():
+        event = _parse_event(buf)
+        if event is None:
+            counts["rejected"] += 1
+        else:
+            batch.append(event)
+    if batch:
+        yield batch
+
 
 @router.post("/events")
 async def ingest_events(req: Request) -> Dict[str, Any]:
-    body: Dict[str, Any] = await req.json()
+    content_type = req.headers.get("content-type", "")
+    if content_type.startswith(("application/x-ndjson", "application/ndjson")):
+        received = 0
+        counts = {"rejected": 0}
+        async for batch in _iter_ndjson_batches(req, counts):
+            write_events(batch)
+            received += len(batch)
+        rejected = counts["rejected"]
+        if rejected:
+            # 잘못된 줄은 버려지므로 클라이언트가 알 수 있도록 응답과 로그에 남김
+            log.warning("ndjson ingest rejected %d malformed line(s), accepted %d", rejected, received)
+        return {"ok": True, "received": received, "rejected": rejected}
+
+    # Parse the raw bytes with orjson (Request.json() decodes to str + stdlib json)
+    body: Dict[str, Any] = orjson.loads(await req.body())
     events = body.get("events", [])
     write_events(events)
     return {"ok": True, "received": len(events)}
-
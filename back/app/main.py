@@ -2,30 +2,46 @@
 애플리케이션 진입점으로, 기능별 라우터를 연결합니다.
 """
 
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
 import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
+from config import CORS_ALLOW_ORIGIN
 from ingest.router import router as ingest_router
 from plugins.router import router as plugins_router
 from plugins.widgets.ai_insights.router import router as ai_insights_router
+from plugins.widgets.ai_insights.explain_service import aclose_http_client as close_ai_insights_http
+from plugins.widgets.ai_report.service import aclose_http_client as close_ai_report_http
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Release pooled LLM connections on shutdown
+    await close_ai_insights_http()
+    await close_ai_report_http()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
-allow_origin = os.getenv("CORS_ALLOW_ORIGIN", "*")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"] if allow_origin == "*" else [allow_origin],
+    allow_origins=["*"] if CORS_ALLOW_ORIGIN == "*" else [CORS_ALLOW_ORIGIN],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress JSON widget payloads (SSE streams are excluded by Starlette)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Mount feature routers
 app.include_router(ingest_router)
 app.include_router(plugins_router)
@@ -2,42 +2,57 @@
 위젯 등 플러그인용 조회 엔드포인트 라우터입니다.
 """
 
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
 import importlib
+import inspect
 import pkgutil
 from pathlib import Path
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from fastapi.params import Depends
+from fastapi.routing import APIRoute
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+from starlette.concurrency import run_in_threadpool
 
 
 router = APIRouter(prefix="/api/query", tags=["plugins"])
 
-def _include_widget_routers(parent: APIRouter) -> None:
-    # 1. 위젯 모듈 기본 경로 설정
-    base_pkg = "plugins.widgets"
-    # 2. plugins/widgets/ 폴더 경로 찾기
+# 위젯 모듈 기본 경로
+_BASE_PKG = "plugins.widgets"
+
+def _widget_names() -> List[str]:
+    # 빌드 시 생성된 매니페스트가 있으면 디렉터리 스캔 없이 사용
+    # (tools/gen_widgets.py, Docker 이미지 빌드 단계에서 생성)
+    try:
+        from ._widgets_manifest import WIDGETS  # type: ignore
+        return list(WIDGETS)
+    except ImportError:
+        pass
+
+    # 매니페스트가 없으면(로컬 개발) plugins/widgets/ 폴더를 직접 스캔
     search_paths = []
     try:
-        pkg = importlib.import_module(base_pkg)
+        pkg = importlib.import_module(_BASE_PKG)
         search_paths = list(getattr(pkg, "__path__", []))
     except Exception:
         # Fallback: resolve via filesystem relative to this file
         search_paths = [str(Path(__file__).parent / "widgets")]
+    return [name for _, name, ispkg in pkgutil.iter_modules(search_paths) if ispkg]
 
-    # 3. widgets/ 폴더 안의 모든 하위 폴더 순회
-    for _, name, ispkg in pkgutil.iter_modules(search_paths):
-        if not ispkg:
-            continue
 
-        # 4. 각 위젯의 router.py 모듈 경로 생성
-        mod_name = f"{base_pkg}.{name}.router"
+def _include_widget_routers(parent: APIRouter) -> None:
+    for name in _widget_names():
+        # 각 위젯의 router.py 모듈 경로 생성
+        mod_name = f"{_BASE_PKG}.{name}.router"
         try:
-            # 5. 위젯의 router 모듈을 import
+            # 위젯의 router 모듈을 import
             mod = importlib.import_module(mod_name)
-            # 6. 모듈에서 'router' 객체 가져오기
+            # 모듈에서 'router' 객체 가져오기
             child = getattr(mod, "router", None)
 
-            # 7. 위젯 라우터를 부모 라우터에 포함
+            # 위젯 라우터를 부모 라우터에 포함
             if child is not None:
                 parent.include_router(child)
         except Exception:
@@ -46,6 +61,72 @@ def _include_widget_routers(parent: APIRouter) -> None:
 
 
 # Auto-load widget routers under plugins/widgets/*/router.py
-# 8. 모든 위젯 라우터 자동 로드
+# 모든 위젯 라우터 자동 로드
 _include_widget_routers(router)
 
+
+def iter_get_routes(parent: APIRouter) -> Iterator[Tuple[str, Callable[..., Any]]]:
+    """Yield (full path, endpoint) for every GET route, including included routers.
+
+    FastAPI >= 0.140 keeps each included router as one `_IncludedRouter` entry
+    in `routes`; `iter_route_contexts` flattens them with prefixes applied.
+    Older releases copy the child APIRoutes into `routes` directly.
+    """
+    try:
+        from fastapi.routing import iter_route_contexts  # FastAPI >= 0.140
+    except ImportError:
+        iter_route_contexts = None
+    routes: List[Any]
+    if iter_route_contexts is None:
+        routes = [route for route in parent.routes if isinstance(route, APIRoute)]
+    else:
+        routes = [ctx for ctx in iter_route_contexts(parent.routes) if isinstance(ctx.original_route, APIRoute)]
+    for route in routes:
+        if "GET" in (route.methods or ()):
+            yield route.path, route.endpoint
+
+
+# 위젯 GET 핸들러 색인 (prefix 제외 경로 -> 엔드포인트), 라우터 로드 후 고정
+_GET_ENDPOINTS: Dict[str, Callable[..., Any]] = {
+    path[len(router.prefix):]: endpoint for path, endpoint in iter_get_routes(router)
+}
+
+
+def _default_kwargs(endpoint: Callable[..., Any]) -> Optional[Dict[str, Any]]:
+    """Resolve every parameter to its declared default, or None if one is required."""
+    kwargs: Dict[str, Any] = {}
+    for name, param in inspect.signature(endpoint).parameters.items():
+        default = param.default
+        if isinstance(default, FieldInfo):
+            default = default.get_default(call_default_factory=True)
+        if default is inspect.Parameter.empty or default is PydanticUndefined or isinstance(default, Depends):
+            return None
+        kwargs[name] = default
+    return kwargs
+
+
+async def _run_widget(tail: str) -> Tuple[str, Any, Optional[str]]:
+    endpoint = _GET_ENDPOINTS.get(tail)
+    kwargs = _default_kwargs(endpoint) if endpoint is not None else None
+    if kwargs is None:
+        return tail, None, "unsupported"
+    try:
+        if inspect.iscoroutinefunction(endpoint):
+            return tail, await endpoint(**kwargs), None
+        return tail, await run_in_threadpool(endpoint, **kwargs), None
+    except Exception as exc:
+        return tail, None, str(exc) or type(exc).__name__
+
+
+# 여러 위젯 조회를 한 번의 요청으로 묶어 실행 (AI 리포트 수집용)
+# Runs several widget GETs with their default parameters in one round trip.
+@router.get("/bundle")
+async def bundle_widgets(
+    widgets: str = Query(..., description="쉼표로 구분한 위젯 경로, 예: /top-pages,/daily-count"),
+) -> Dict[str, Any]:
+    tails = list(dict.fromkeys(t.strip() for t in widgets.split(",") if t.strip()))
+    results = await asyncio.gather(*(_run_widget(tail) for tail in tails))
+    return {
+        "widgets": {tail: payload for tail, payload, err in results if err is None},
+        "errors": {tail: err for tail, _, err in results if err is not None},
+    }
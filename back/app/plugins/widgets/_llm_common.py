@@ -0,0 +1,42 @@
+"""Helpers shared by the LLM-backed widgets (ai_report, ai_insights).
+AI 위젯들이 공통으로 사용하는 보조 함수입니다.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from config import is_running_in_docker
+
+# (epoch second, ISO string); the stamp only has second resolution anyway
+_TS_CACHE: Tuple[int, str] = (-1, "")
+
+
+def now_iso() -> str:
+    """Current UTC time as a second-precision ISO-8601 string."""
+    global _TS_CACHE
+    t = int(time.time())
+    if t != _TS_CACHE[0]:
+        _TS_CACHE = (t, datetime.fromtimestamp(t, timezone.utc).isoformat())
+    return _TS_CACHE[1]
+
+
+def ollama_candidates(endpoint: str, explicit: bool = False) -> Tuple[str, ...]:
+    """Ollama base URLs to try, in order, each host once.
+
+    An explicitly configured endpoint is used alone; otherwise the docker
+    service name and localhost are probed after it.
+    """
+    if explicit and endpoint:
+        # 명시적으로 설정된 엔드포인트만 사용 (기본 호스트 탐색 생략)
+        return (endpoint,)
+    candidates: List[str] = []
+    if endpoint:
+        candidates.append(endpoint)
+    if is_running_in_docker():
+        candidates.append("http://ollama:11434")
+    candidates.append("http://localhost:11434")
+    # The configured endpoint often is one of the defaults
+    return tuple(dict.fromkeys(candidates))
@@ -3,89 +3,140 @@ Robust Ollama/OpenAI calls, safe JSON parsing, and configurable caching.
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import hashlib
 import logging
+import re
 from typing import Any, Dict, List, Optional, Tuple
-from datetime import datetime, timezone
 
 import httpx
+import orjson
 from cachetools import TTLCache
 from fastapi import HTTPException
 
 from config import (
     AI_INSIGHTS_EXPLAIN_CACHE_TTL,
+    AI_INSIGHTS_MAX_SERIES_POINTS,
+    AI_INSIGHTS_TOP_PATHS,
     LLM_API_KEY,
     LLM_ENDPOINT,
+    LLM_MAX_CONCURRENCY,
     LLM_MAX_TOKENS,
     LLM_MODEL,
     LLM_PROVIDER,
     LLM_TEMPERATURE,
     LLM_TIMEOUT_S,
-    is_running_in_docker,
 )
 
+from .._llm_common import now_iso as _now_iso, ollama_candidates
+
 log = logging.getLogger("ai_insights")
 
 # Cache TTL for explain results (seconds). Set to 0 to disable caching.
 EXPLAIN_CACHE_TTL_S = AI_INSIGHTS_EXPLAIN_CACHE_TTL
-_cache = TTLCache(maxsize=256, ttl=max(0, EXPLAIN_CACHE_TTL_S))
+_CACHE_MAX = 256
+# LRU with per-entry expiry; only touched from the event loop, so no lock
+_cache: TTLCache = TTLCache(maxsize=_CACHE_MAX, ttl=max(EXPLAIN_CACHE_TTL_S, 1e-3))
+
+# Shared HTTP client: keeps LLM connections alive across explain calls.
+# Built on first use so a closed client is never reused by a later lifespan.
+_http: Optional[httpx.AsyncClient] = None
+# In-flight explain computations keyed by cache key (see generate_insights)
+_inflight: Dict[str, asyncio.Future] = {}
+# Caps in-flight LLM calls so a burst of explains doesn't overwhelm Ollama.
+_llm_slots = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+
+
+def _get_http() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=min(10.0, LLM_TIMEOUT_S)),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+    return _http
+
+
+async def aclose_http_client() -> None:
+    global _http
+    client, _http = _http, None
+    if client is not None:
+        await client.aclose()
 
 
 # ---- Utils ----
-def _now_iso() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    return _cache.get(key)
+
+def _cache_set(key: str, value: Dict[str, Any]) -> None:
+    if EXPLAIN_CACHE_TTL_S <= 0:
+        return
+    _cache[key] = value
+
+def _round_point(p: Any) -> Any:
+    if not isinstance(p, dict):
+        return p
+    v = p.get("v")
+    return (p.get("t"), round(v, 4) if isinstance(v, float) else v)
+
+def _canonical_digest(digest: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the sections that shape the LLM answer; version is left out.
+    Series values are rounded so float noise still hits the cache.
+    """
+    series = digest.get("series") or {}
+    return {
+        "tw": digest.get("time_window"),
+        "totals": digest.get("totals"),
+        "series": {
+            k: [_round_point(p) for p in arr] if isinstance(arr, list) else arr
+            for k, arr in series.items()
+        },
+        "top_paths": digest.get("top_paths"),
+        "errors": digest.get("errors"),
+        "funnels": digest.get("funnels"),
+        "anomalies": digest.get("anomalies"),
+        # Rendered into the prompt, so a different site/filter is a different answer
+        "context": digest.get("context", {}),
+    }
 
 def _cache_key(digest: Dict[str, Any], language: str, word_limit: int, audience: str) -> str:
-    blob = json.dumps({
-        "d": digest,
-        "lang": language,
-        "w": word_limit,
-        "aud": audience,
-        "prov": LLM_PROVIDER,
-        "model": LLM_MODEL,
-    }, sort_keys=True)
-    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    # blake2b is faster than sha256 and a 128-bit key is plenty for an in-proc cache.
+    # The scalar parts are fed separately instead of wrapping everything in one blob.
+    h = hashlib.blake2b(digest_size=16)
+    h.update(orjson.dumps(_canonical_digest(digest), option=orjson.OPT_SORT_KEYS))
+    for part in (language, str(word_limit), audience, LLM_PROVIDER, LLM_MODEL):
+        h.update(b"\x00")
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+_JSON_DECODER = json.JSONDecoder()
 
 def _extract_json(text: str) -> Dict[str, Any]:
     # 1) Entire content is JSON
     try:
-        return json.loads(text)
-    except Exception:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
-    # 2) Find first balanced {...}
+    # 2) First decodable {...}: raw_decode scans in C and stops at the object boundary
     start = text.find("{")
-    if start == -1:
-        return {"generated_at": _now_iso(), "insights": [], "meta": {"fallback": "parse_failed"}}
-    depth = 0
-    in_string = False
-    escape = False
-    for i, ch in enumerate(text[start:], start):
-        if in_string:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == '"':
-                in_string = False
-        else:
-            if ch == '"':
-                in_string = True
-            elif ch == '{':
-                depth += 1
-            elif ch == '}':
-                depth -= 1
-                if depth == 0:
-                    candidate = text[start:i+1]
-                    try:
-                        return json.loads(candidate)
-                    except Exception:
-                        break
+    while start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            start = text.find("{", start + 1)
     return {"generated_at": _now_iso(), "insights": [], "meta": {"fallback": "parse_failed"}}
 
-def _is_docker() -> bool:
-    return is_running_in_docker()
+# Config and the runtime never change within a process; resolve once at import.
+_OLLAMA_CANDIDATES = ollama_candidates(LLM_ENDPOINT)
 # ---- Error-to-status mapping (Ollama) ----
+# One scan per category instead of a chain of substring checks
+# ("disconnect" also covers "disconnected", "downloading" covers "model is downloading")
+_OLL_NOT_FOUND_RE = re.compile(r"model not found|no such model|unknown model")
+_OLL_PULLING_RE = re.compile(r"pull|downloading|waiting for model")
+_OLL_DISCONNECT_RE = re.compile(r"disconnect")
+_OLL_DOWNLOADING_MSG = "모델을 다운로드 중입니다. 잠시 후 다시 시도해주세요."
+
 def _ollama_status_from_exception(exc: Exception) -> Tuple[Optional[str], Optional[str]]:
     """Map exceptions from Ollama calls to user-friendly status messages.
     Returns (code, message) or (None, None) if not a recognized Ollama status.
@@ -97,11 +148,8 @@ def _ollama_status_from_exception(exc: Exception) -> Tuple[Optional[str], Option
     # Connection issues
     if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout)):
         # Some transient disconnects happen while models are being prepared
-        if "disconnect" in msg or "disconnected" in msg:
-            return (
-                "model_downloading",
-                "모델을 다운로드 중입니다. 잠시 후 다시 시도해주세요.",
-            )
+        if _OLL_DISCONNECT_RE.search(msg):
+            return ("model_downloading", _OLL_DOWNLOADING_MSG)
         return (
             "ollama_unreachable",
             "AI 백엔드(Ollama)에 연결할 수 없습니다. Docker/Ollama 상태를 확인해주세요.",
@@ -115,37 +163,22 @@ def _ollama_status_from_exception(exc: Exception) -> Tuple[Optional[str], Option
             status = None
             body = msg
         # 404: model not found
-        if status == 404 or "model not found" in body or "no such model" in body or "unknown model" in body:
+        if status == 404 or _OLL_NOT_FOUND_RE.search(body):
             return (
                 "model_not_found",
                 f"모델을 찾을 수 없습니다: {LLM_MODEL}. 먼저 모델을 다운로드 해주세요.",
             )
         # 503/5xx with pulling/downloading indicators
-        if (status == 503 or (status and 500 <= status < 600)) or (
-            "pull" in body or "downloading" in body or "waiting for model" in body or "model is downloading" in body
-        ):
-            return (
-                "model_downloading",
-                "모델을 다운로드 중입니다. 잠시 후 다시 시도해주세요.",
-            )
+        if (status and 500 <= status < 600) or _OLL_PULLING_RE.search(body):
+            return ("model_downloading", _OLL_DOWNLOADING_MSG)
     # Heuristic fallback by message
-    if "model not found" in msg or "no such model" in msg or "unknown model" in msg:
+    if _OLL_NOT_FOUND_RE.search(msg):
         return (
             "model_not_found",
             f"모델을 찾을 수 없습니다: {LLM_MODEL}. 먼저 모델을 다운로드 해주세요.",
         )
-    if (
-        "pull" in msg
-        or "downloading" in msg
-        or "waiting for model" in msg
-        or "model is downloading" in msg
-        or "disconnect" in msg
-        or "disconnected" in msg
-    ):
-        return (
-            "model_downloading",
-            "모델을 다운로드 중입니다. 잠시 후 다시 시도해주세요.",
-        )
+    if _OLL_PULLING_RE.search(msg) or _OLL_DISCONNECT_RE.search(msg):
+        return ("model_downloading", _OLL_DOWNLOADING_MSG)
     return (None, None)
 def _status_insight(message: str, code: str) -> Dict[str, Any]:
     """Build a response that surfaces status to the UI as an insight item.
@@ -209,73 +242,111 @@ def _rule_based_insights(digest: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # ---- Prompt builder ----
+def _head(val: Any, n: int) -> Any:
+    return val[:n] if isinstance(val, list) and len(val) > n else val
+
+# Precision the LLM actually needs per series; extra digits only cost tokens
+_SERIES_QUANTIZERS = {
+    "pageviews": lambda v: int(v),
+    "error_rate": lambda v: round(float(v), 4),
+}
+
+
+def _quantize_series(name: str, arr: Any) -> Any:
+    """Round series values for the prompt and drop trailing zero points."""
+    quant = _SERIES_QUANTIZERS.get(name)
+    if quant is None or not isinstance(arr, list):
+        return arr
+    out = []
+    for p in arr:
+        v = p.get("v") if isinstance(p, dict) else None
+        if isinstance(v, (int, float)):
+            p = {"t": p.get("t"), "v": quant(v)}
+        out.append(p)
+    while out and isinstance(out[-1], dict) and out[-1].get("v") == 0:
+        out.pop()
+    return out
+
+
 def _compact_digest(digest: Dict[str, Any], max_points: int = None, top_n_paths: int = None) -> Dict[str, Any]:
     try:
-        mp = max_points if isinstance(max_points, int) and max_points > 0 else _int_env("AI_INSIGHTS_MAX_SERIES_POINTS", 40)
-        tp = top_n_paths if isinstance(top_n_paths, int) and top_n_paths > 0 else _int_env("AI_INSIGHTS_TOP_PATHS", 10)
-        d = dict(digest)
-        series = dict(d.get("series", {}))
-        out_series: Dict[str, List[Dict[str, Any]]] = {}
-        for k, arr in series.items():
-            if isinstance(arr, list) and len(arr) > mp:
-                out_series[k] = arr[-mp:]
-            else:
-                out_series[k] = arr
-        d["series"] = out_series
-        if isinstance(d.get("top_paths"), list) and len(d["top_paths"]) > tp:
-            d["top_paths"] = d["top_paths"][:tp]
-        # Optional trims
-        for key in ("errors", "anomalies", "funnels"):
-            val = d.get(key)
-            if isinstance(val, list) and len(val) > tp:
-                d[key] = val[:tp]
-        return d
+        mp = max_points if isinstance(max_points, int) and max_points > 0 else AI_INSIGHTS_MAX_SERIES_POINTS
+        tp = top_n_paths if isinstance(top_n_paths, int) and top_n_paths > 0 else AI_INSIGHTS_TOP_PATHS
+        # Build the trimmed view directly; untouched sections are shared, not copied
+        return {
+            "version": digest.get("version"),
+            "time_window": digest.get("time_window", {}),
+            "context": digest.get("context", {}),
+            "totals": digest.get("totals", {}),
+            "series": {
+                k: _quantize_series(k, arr[-mp:] if isinstance(arr, list) and len(arr) > mp else arr)
+                for k, arr in (digest.get("series") or {}).items()
+            },
+            "top_paths": [
+                {"path": p.get("path"), "pv": p.get("pv")} if isinstance(p, dict) else p
+                for p in _head(digest.get("top_paths", []), tp)
+            ],
+            "errors": _head(digest.get("errors", {}), tp),
+            "funnels": _head(digest.get("funnels", []), tp),
+            "anomalies": _head(digest.get("anomalies", []), tp),
+        }
     except Exception:
         return digest
 
+# Static prompt parts, serialized once at import
+_SCHEMA_HINT = {
+    "generated_at": "ISO8601",
+    "insights": [{
+        "title": "string",
+        "severity": "low|medium|high|critical",
+        "metric_refs": ["metric@time or path:..."],
+        "evidence": {"any": "numbers/paths/codes"},
+        "explanation": "string",
+        "action": "string"
+    }],
+    "meta": {"prompt_version": "v1"}
+}
+_SCHEMA_HINT_JSON = orjson.dumps(_SCHEMA_HINT).decode()
+_SYSTEM_PROMPT = (
+    "You are a senior analytics engineer. "
+    "Return STRICT JSON ONLY that matches the 'Insights' schema. "
+    "No preface, no markdown, no additional text. "
+    "Do not include any PII or user-level details."
+)
+
+# Messages are only read downstream, so one system message dict is shared
+_SYSTEM_MESSAGE: Dict[str, str] = {"role": "system", "content": _SYSTEM_PROMPT}
+# Everything after the per-request header lines is fixed
+_USER_INSTRUCTIONS = (
+    "Using the following Digest JSON, produce 'Insights' JSON with 3-6 concise items.\n"
+    "Each item must include: title, severity, metric_refs, evidence(with numbers), explanation, action.\n"
+    "Respond with JSON only, matching this schema:\n"
+    f"{_SCHEMA_HINT_JSON}\n\n"
+    "DIGEST:\n"
+)
+
+
 def _build_messages(digest: Dict[str, Any], language: str, word_limit: int, audience: str) -> List[Dict[str, str]]:
     # Use a compacted digest for Ollama to reduce tokens and latency
     use_digest = _compact_digest(digest) if LLM_PROVIDER == "ollama" else digest
-    schema_hint = {
-        "generated_at": "ISO8601",
-        "insights": [{
-            "title": "string",
-            "severity": "low|medium|high|critical",
-            "metric_refs": ["metric@time or path:..."],
-            "evidence": {"any": "numbers/paths/codes"},
-            "explanation": "string",
-            "action": "string"
-        }],
-        "meta": {"prompt_version": "v1"}
-    }
-    system = (
-        "You are a senior analytics engineer. "
-        "Return STRICT JSON ONLY that matches the 'Insights' schema. "
-        "No preface, no markdown, no additional text. "
-        "Do not include any PII or user-level details."
-    )
-    user = (
-        f"Language: {language}\n"
-        f"Audience: {audience}\n"
-        f"WordLimit: {word_limit}\n\n"
-        "Using the following Digest JSON, produce 'Insights' JSON with 3-6 concise items.\n"
-        "Each item must include: title, severity, metric_refs, evidence(with numbers), explanation, action.\n"
-        "Respond with JSON only, matching this schema:\n"
-        f"{json.dumps(schema_hint, ensure_ascii=False)}\n\n"
-        f"DIGEST:\n{json.dumps(use_digest, ensure_ascii=False)}"
-    )
-    return [
-        {"role": "system", "content": system},
-        {"role": "user", "content": user},
-    ]
+    # One join over the small header, the constant block and the digest dump
+    user = "".join((
+        f"Language: {language}\nAudience: {audience}\nWordLimit: {word_limit}\n\n",
+        _USER_INSTRUCTIONS,
+        orjson.dumps(use_digest).decode(),
+    ))
+    return [_SYSTEM_MESSAGE, {"role": "user", "content": user}]
 
 
 # ---- OpenAI-compatible ----
-def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
-    url = (LLM_ENDPOINT or "").rstrip("/") + "/v1/chat/completions"
-    headers = {"Content-Type": "application/json"}
-    if LLM_API_KEY:
-        headers["Authorization"] = f"Bearer {LLM_API_KEY}"
+# LLM_ENDPOINT is already stripped of trailing "/" by config
+_OPENAI_CHAT_URL = LLM_ENDPOINT + "/v1/chat/completions"
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_OPENAI_HEADERS = dict(_JSON_HEADERS)
+if LLM_API_KEY:
+    _OPENAI_HEADERS["Authorization"] = f"Bearer {LLM_API_KEY}"
+
+async def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
     payload = {
         "model": LLM_MODEL,
         "messages": messages,
@@ -283,49 +354,61 @@ def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
         "max_tokens": LLM_MAX_TOKENS,
         "response_format": {"type": "json_object"},
     }
-    with httpx.Client(timeout=LLM_TIMEOUT_S) as client:
-        r = client.post(url, headers=headers, json=payload)
-        r.raise_for_status()
-        data = r.json()
-        return data["choices"][0]["message"]["content"]
+    # orjson emits the body bytes directly; httpx's json= would run stdlib json
+    r = await _get_http().post(_OPENAI_CHAT_URL, headers=_OPENAI_HEADERS, content=orjson.dumps(payload))
+    r.raise_for_status()
+    data = orjson.loads(r.content)
+    return data["choices"][0]["message"]["content"]
 
 
 # ---- Ollama resilient ----
-def _call_ollama_resilient(messages: List[Dict[str, str]]) -> str:
-    candidates: List[str] = []
-    if LLM_ENDPOINT:
-        candidates.append(LLM_ENDPOINT)
-    if _is_docker():
-        candidates.append("http://ollama:11434")
-    candidates.append("http://localhost:11434")
+# Per-endpoint memory of whether `format=json` works, so a learned endpoint
+# gets a single attempt instead of the json -> plain probe pair.
+_json_mode_ok: Dict[str, bool] = {}
+
+# Set default and all four timeouts to satisfy httpx requirements
+_OLLAMA_TIMEOUT = httpx.Timeout(
+    LLM_TIMEOUT_S,
+    connect=min(10.0, LLM_TIMEOUT_S),
+    read=LLM_TIMEOUT_S,
+    write=LLM_TIMEOUT_S,
+    pool=LLM_TIMEOUT_S,
+)
+
 
+def _rejects_json_format(exc: Exception) -> bool:
+    """True when Ollama answered 400 complaining about the `format` field."""
+    if not isinstance(exc, httpx.HTTPStatusError) or exc.response.status_code != 400:
+        return False
+    try:
+        return "format" in exc.response.text.lower()
+    except Exception:
+        return False
+
+
+async def _call_ollama_resilient(messages: List[Dict[str, str]]) -> str:
     last_err: Optional[Exception] = None
-    for ep in candidates:
-        base = (ep or "").rstrip("/")
-        if not base:
-            continue
+    for base in _OLLAMA_CANDIDATES:
         url = base + "/api/chat"
-        for use_json_mode in (True, False):
+        known = _json_mode_ok.get(base)
+        modes = (True, False) if known is None else (known,)
+        for use_json_mode in modes:
             payload = {"model": LLM_MODEL, "messages": messages, "stream": False}
             if use_json_mode:
                 payload["format"] = "json"
             try:
                 log.info("[ai] ollama POST %s model=%s json_mode=%s", url, LLM_MODEL, use_json_mode)
-                # Set default and all four timeouts to satisfy httpx requirements
-                timeout = httpx.Timeout(
-                    LLM_TIMEOUT_S,
-                    connect=min(10.0, LLM_TIMEOUT_S),
-                    read=LLM_TIMEOUT_S,
-                    write=LLM_TIMEOUT_S,
-                    pool=LLM_TIMEOUT_S,
-                )
-                with httpx.Client(timeout=timeout) as client:
-                    r = client.post(url, json=payload)
-                    r.raise_for_status()
-                    data = r.json()
-                    return data["message"]["content"]
+                r = await _get_http().post(url, headers=_JSON_HEADERS, content=orjson.dumps(payload), timeout=_OLLAMA_TIMEOUT)
+                r.raise_for_status()
+                data = orjson.loads(r.content)
+                content = data["message"]["content"]
+                if use_json_mode:
+                    _json_mode_ok[base] = True
+                return content
             except Exception as e:
                 last_err = e
+                if use_json_mode and _rejects_json_format(e):
+                    _json_mode_ok[base] = False
                 log.warning("[ai] ollama failed: %s json_mode=%s (%s)", url, use_json_mode, e)
                 continue
     if last_err:
@@ -334,11 +417,26 @@ def _call_ollama_resilient(messages: List[Dict[str, str]]) -> str:
 
 
 # ---- Entry point ----
-def generate_insights(digest: Dict[str, Any], language: str, word_limit: int, audience: str) -> Dict[str, Any]:
+async def generate_insights(digest: Dict[str, Any], language: str, word_limit: int, audience: str) -> Dict[str, Any]:
     key = _cache_key(digest, language, word_limit, audience)
-    if EXPLAIN_CACHE_TTL_S > 0 and key in _cache:
-        return _cache[key]
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    # Single-flight: identical concurrent requests await the same LLM call.
+    # Check-and-set has no await in between, so it is atomic on the event loop.
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_generate_insights(key, digest, language, word_limit, audience))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: a disconnecting caller must not cancel the call others are awaiting
+    return await asyncio.shield(task)
+
 
+async def _generate_insights(
+    key: str, digest: Dict[str, Any], language: str, word_limit: int, audience: str
+) -> Dict[str, Any]:
     messages = _build_messages(digest, language, word_limit, audience)
     try:
         log.info("[ai] provider=%s model=%s endpoint=%s", LLM_PROVIDER, LLM_MODEL, LLM_ENDPOINT)
@@ -347,21 +445,21 @@ def generate_insights(digest: Dict[str, Any], language: str, word_limit: int, au
 
     try:
         if LLM_PROVIDER in ("vllm", "openai_compat", "openai"):
-            content = _call_openai_compatible(messages)
+            async with _llm_slots:
+                content = await _call_openai_compatible(messages)
         elif LLM_PROVIDER == "ollama":
-            content = _call_ollama_resilient(messages)
+            async with _llm_slots:
+                content = await _call_ollama_resilient(messages)
         else:
             result = _rule_based_insights(digest)
-            if EXPLAIN_CACHE_TTL_S > 0:
-                _cache[key] = result
+            _cache_set(key, result)
             return result
 
         parsed = _extract_json(content)
         parsed.setdefault("generated_at", _now_iso())
         meta = parsed.setdefault("meta", {})
         meta.update({"provider": LLM_PROVIDER, "model": LLM_MODEL, "prompt_version": "v1"})
-        if EXPLAIN_CACHE_TTL_S > 0:
-            _cache[key] = parsed
+        _cache_set(key, parsed)
         return parsed
 
     except Exception as e:
@@ -407,6 +505,5 @@ def generate_insights(digest: Dict[str, Any], language: str, word_limit: int, au
             result["meta"]["error"] = str(e)[:500]
         except Exception:
             pass
-        if EXPLAIN_CACHE_TTL_S > 0:
-            _cache[key] = result
+        _cache_set(key, result)
         return result
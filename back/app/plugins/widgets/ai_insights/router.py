@@ -21,9 +21,9 @@ def get_aggregate(
     return digest
 
 @router.post("/explain", response_model=Insights)
-def post_explain(req: ExplainRequest):
+async def post_explain(req: ExplainRequest):
     """
     Digest -> LLM Insights (또는 룰 기반 폴백) 생성.
     """
-    return generate_insights(req.digest.model_dump(by_alias=True),
-                             req.language, req.word_limit, req.audience)
\ No newline at end of file
+    return await generate_insights(req.digest.model_dump(by_alias=True),
+                                   req.language, req.word_limit, req.audience)
\ No newline at end of file
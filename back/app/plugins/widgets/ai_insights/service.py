@@ -1,84 +1,174 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import re
 
-import math
+import atexit
 import logging
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+import orjson
+from cachetools import TTLCache
+
 log = logging.getLogger(__name__)
 
 from config import (
+    AI_INSIGHTS_CACHE_MAX,
     AI_INSIGHTS_CACHE_TTL,
+    AI_INSIGHTS_POOL,
     INFLUX_TOKEN,
     INFLUX_URL,
     INFLUX_DATABASE,
+    REDIS_URL,
 )
 
 # ------------------------------------------------------------
-# 간단 캐시 (in-proc)
+# 캐시 (in-proc L1 + optional Redis L2)
 # ------------------------------------------------------------
-_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+# Bounded TTL cache; build_digest runs on worker threads, hence the lock
 _TTL = AI_INSIGHTS_CACHE_TTL
+_cache: TTLCache = TTLCache(maxsize=max(1, AI_INSIGHTS_CACHE_MAX), ttl=max(0.0, _TTL))
+_cache_lock = threading.Lock()
 
 def _cache_get(key: str):
-    v = _cache.get(key)
-    if not v:
-        return None
-    ts, data = v
-    if time.time() - ts > _TTL:
-        _cache.pop(key, None)
-        return None
+    with _cache_lock:
+        data = _cache.get(key)
+    if data is None and REDIS_URL:
+        data = _l2_get(key)
+        if data is not None:
+            with _cache_lock:
+                _cache[key] = data
     return data
 
 def _cache_set(key: str, data: Dict[str, Any]):
-    _cache[key] = (time.time(), data)
+    with _cache_lock:
+        _cache[key] = data
+    if REDIS_URL:
+        _l2_set(key, data)
+
+# Redis L2 shared by all workers; optional dependency, failures degrade to L1 only
+_L2_PREFIX = "apilog:digest:"
+_redis = None
+# After a failed call, skip Redis for this long so an outage doesn't add the
+# socket timeout to every L1 miss (monotonic deadline; float writes are atomic)
+_L2_BACKOFF_S = 30.0
+_l2_down_until = 0.0
+
+def _l2():
+    global _redis
+    if _l2_down_until and time.monotonic() < _l2_down_until:
+        return None
+    if _redis is None:
+        # Resolved once per process, so each warning below is logged once
+        try:
+            import redis  # type: ignore
+        except ImportError as e:
+            log.warning("[ai] REDIS_URL is set but the redis package is not installed; L2 cache disabled (%s)", e)
+            _redis = False
+            return None
+        try:
+            _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        except Exception as e:
+            log.warning("[ai] redis cache disabled, invalid REDIS_URL: %s", e)
+            _redis = False
+    return _redis or None
+
+def _l2_trip(op: str, exc: Exception) -> None:
+    global _l2_down_until
+    _l2_down_until = time.monotonic() + _L2_BACKOFF_S
+    log.warning("[ai] redis %s failed, bypassing L2 for %.0fs: %s", op, _L2_BACKOFF_S, exc)
+
+def _l2_get(key: str) -> Optional[Dict[str, Any]]:
+    cli = _l2()
+    if cli is None:
+        return None
+    try:
+        raw = cli.get(_L2_PREFIX + key)
+    except Exception as e:
+        _l2_trip("get", e)
+        return None
+    try:
+        return orjson.loads(raw) if raw else None
+    except orjson.JSONDecodeError as e:
+        log.debug("[ai] redis entry unreadable: %s", e)
+        return None
+
+def _l2_set(key: str, data: Dict[str, Any]) -> None:
+    cli = _l2()
+    if cli is None or _TTL <= 0:
+        return
+    try:
+        cli.set(_L2_PREFIX + key, orjson.dumps(data), px=int(_TTL * 1000))
+    except Exception as e:
+        _l2_trip("set", e)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # InfluxDB 3 (SQL/Flight)
 # ──────────────────────────────────────────────────────────────────────────────
-_sql_client = None
+# One client (and Flight channel) per worker thread so concurrent queries
+# from the digest pool don't contend on a single connection.
+_tls = threading.local()
 
 def _get_sql_client():
-    global _sql_client
-    if _sql_client is not None:
-        return _sql_client
-    from influxdb_client_3 import InfluxDBClient3
-    _sql_client = InfluxDBClient3(
-        host=INFLUX_URL,
-        token=INFLUX_TOKEN,
-        database=INFLUX_DATABASE,
-    )
-    return _sql_client
+    cli = getattr(_tls, "cli", None)
+    if cli is None:
+        from influxdb_client_3 import InfluxDBClient3
+        cli = InfluxDBClient3(
+            host=INFLUX_URL,
+            token=INFLUX_TOKEN,
+            database=INFLUX_DATABASE,
+        )
+        _tls.cli = cli
+    return cli
 
-def _to_records(df_obj) -> List[Dict[str, Any]]:
-    if hasattr(df_obj, "to_dict"):
-        return df_obj.to_dict(orient="records")
-    try:
-        import pyarrow as pa  # type: ignore
-        if isinstance(df_obj, pa.Table):
-            cols = df_obj.column_names
-            arrays = [c.to_pylist() for c in df_obj.columns]
-            return [{cols[i]: row[i] for i in range(len(cols))} for row in zip(*arrays)]
-    except Exception:
-        pass
-    return []
-
-def _sql_query(query: str) -> List[Dict[str, Any]]:
+def _sql_table(query: str, params: Optional[Dict[str, Any]] = None):
+    """Run `query` and return the Arrow table as-is (no per-row dicts).
+
+    Values go through `params` ($name placeholders) so the query text stays
+    identical across requests. Record-batch size is chosen server-side
+    (DataFusion streams ~8192-row batches); Flight call options have no
+    client override, so keep every SELECT projected to the columns it reads.
+    """
+    import pyarrow as pa  # type: ignore
     cli = _get_sql_client()
-    df = cli.query(query)
-    return _to_records(df)
+    res = cli.query(query, mode="all", query_parameters=params or {})
+    if isinstance(res, pa.Table):
+        return res
+    if hasattr(res, "read_all"):
+        return res.read_all()
+    if hasattr(res, "to_dict"):
+        return pa.Table.from_pandas(res, preserve_index=False)
+    return pa.table({})
+
+def _columns(tbl, *names: str) -> List[List[Any]]:
+    """Column-wise pylists; a missing column reads as all-None.
+
+    DATE_BIN columns are Arrow timestamps, so they come back as datetimes
+    and callers can use `.isoformat()` without type checks.
+    """
+    n = tbl.num_rows
+    return [
+        tbl.column(name).to_pylist() if name in tbl.column_names else [None] * n
+        for name in names
+    ]
+
+# Shared pool for the digest queries (Influx I/O wait); reused across requests
+_POOL = ThreadPoolExecutor(max_workers=max(1, AI_INSIGHTS_POOL), thread_name_prefix="ai-digest")
+atexit.register(_POOL.shutdown, wait=False)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 유틸
 # ──────────────────────────────────────────────────────────────────────────────
+# bucket 파라미터 → DATE_BIN interval (allowlist)
+_BUCKETS = {"1h": "1 hour", "3h": "3 hour", "6h": "6 hour", "1d": "1 day"}
+_INTERVALS = frozenset(_BUCKETS.values())
+
 def _normalize_bucket(s: str) -> str:
-    s = (s or "1h").lower()
-    allow = {"1h": "1 hour", "3h": "3 hour", "6h": "6 hour", "1d": "1 day"}
-    return allow.get(s, "1 hour")
+    return _BUCKETS.get((s or "1h").lower(), "1 hour")
 
 def _validate_site_id(site_id: str) -> str:
     """Validate `site_id` to prevent SQL injection.
@@ -92,170 +182,279 @@ def _validate_site_id(site_id: str) -> str:
         raise ValueError("Invalid site_id: only alphanumerics, `_` and `-` are allowed")
     return site_id
 
+def _window_params(from_iso: str, to_iso: str, site_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """Site filter clause plus bound parameters for a time-window query."""
+    params: Dict[str, Any] = {"from_ts": from_iso, "to_ts": to_iso}
+    if not site_id:
+        return "", params
+    params["site_id"] = _validate_site_id(site_id)
+    return "AND site_id = $site_id", params
+
+def _interval(bucket_sql: str) -> str:
+    """Pass through a normalized interval; anything else goes through the allowlist."""
+    return bucket_sql if bucket_sql in _INTERVALS else _normalize_bucket(bucket_sql)
+
 def _iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).replace(microsecond=0).isoformat()
 
-def _z_scores(points: List[Dict[str, Any]], key: str = "v", z: float = 3.0) -> List[Dict[str, Any]]:
-    vals = [p[key] for p in points if isinstance(p.get(key), (int, float))]
-    if len(vals) < 5:
-        return []
-    mean = sum(vals) / len(vals)
-    var = sum((x - mean) ** 2 for x in vals) / len(vals)
-    std = math.sqrt(var)
+def _z_kernel_np(vals: np.ndarray) -> np.ndarray:
+    std = vals.std()
     if std == 0:
+        return np.zeros_like(vals)
+    return (vals - vals.mean()) * (1.0 / std)
+
+try:
+    from numba import njit  # type: ignore
+except ImportError:  # optional: NumPy path is the fallback
+    njit = None
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _z_kernel(vals):  # pragma: no cover - depends on numba
+        n = vals.shape[0]
+        mean = 0.0
+        for i in range(n):
+            mean += vals[i]
+        mean /= n
+        var = 0.0
+        for i in range(n):
+            d = vals[i] - mean
+            var += d * d
+        std = np.sqrt(var / n)
+        out = np.zeros(n)
+        if std == 0.0:
+            return out
+        inv = 1.0 / std
+        for i in range(n):
+            out[i] = (vals[i] - mean) * inv
+        return out
+else:
+    _z_kernel = _z_kernel_np
+
+def _z_scores(points: List[Dict[str, Any]], key: str = "v", z: float = 3.0) -> List[Dict[str, Any]]:
+    pts = [p for p in points if isinstance(p.get(key), (int, float))]
+    if len(pts) < 5:
         return []
-    out = []
-    for p in points:
-        v = p.get(key)
-        if not isinstance(v, (int, float)):
-            continue
-        zval = (v - mean) / std
-        if abs(zval) >= z:
-            out.append({"metric": "pageviews", "at": p["t"], "z": round(zval, 2)})
-    return out
-
-def _timed(name: str, fn):
+    arr = np.fromiter((p[key] for p in pts), dtype=np.float64, count=len(pts))
+    zs = _z_kernel(arr)
+    idx = np.flatnonzero(np.abs(zs) >= z)
+    return [{"metric": "pageviews", "at": pts[i]["t"], "z": round(float(zs[i]), 2)} for i in idx]
+
+def _timed(name: str, fn, *args, **kwargs):
     t0 = time.perf_counter()
     try:
-        return fn()
+        return fn(*args, **kwargs)
     finally:
         log.info("[ai] %s took %.3fs", name, time.perf_counter() - t0)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 집계 쿼리 (SQL)
 # ──────────────────────────────────────────────────────────────────────────────
-def q_pv_series(from_iso: str, to_iso: str, bucket_str: str, site_id: Optional[str]=None) -> List[Dict[str, Any]]:
-    bucket_sql = _normalize_bucket(bucket_str)
-    where_site = f"AND site_id = '{_validate_site_id(site_id)}'" if site_id else ""
+def q_pv_series(from_iso: str, to_iso: str, bucket_sql: str, site_id: Optional[str]=None) -> List[Dict[str, Any]]:
+    where_site, params = _window_params(from_iso, to_iso, site_id)
     sql = f"""
-SELECT DATE_BIN(INTERVAL '{bucket_sql}', time) AS bucket,
+SELECT DATE_BIN(INTERVAL '{_interval(bucket_sql)}', time) AS bucket,
        SUM("count")::BIGINT AS pv
 FROM "events"
-WHERE time BETWEEN TIMESTAMP '{from_iso}' AND TIMESTAMP '{to_iso}'
+WHERE time BETWEEN CAST($from_ts AS TIMESTAMP) AND CAST($to_ts AS TIMESTAMP)
   AND event_name = 'page_view'
   {where_site}
 GROUP BY bucket
 ORDER BY bucket;
 """
-    rows = _sql_query(sql)
-    out = []
-    for r in rows:
-        b = r["bucket"]
-        t = b.isoformat() if hasattr(b, "isoformat") else str(b)
-        out.append({"t": t, "v": int(r.get("pv", 0) or 0)})
-    return out
+    buckets, pvs = _columns(_sql_table(sql, params), "bucket", "pv")
+    return [{"t": b.isoformat(), "v": int(v or 0)} for b, v in zip(buckets, pvs)]
 
 def q_top_paths(from_iso: str, to_iso: str, site_id: Optional[str]=None, limit:int=10) -> List[Dict[str, Any]]:
-    where_site = f"AND site_id = '{_validate_site_id(site_id)}'" if site_id else ""
+    where_site, params = _window_params(from_iso, to_iso, site_id)
     sql = f"""
 SELECT path, SUM("count")::BIGINT AS pv
 FROM "events"
-WHERE time BETWEEN TIMESTAMP '{from_iso}' AND TIMESTAMP '{to_iso}'
+WHERE time BETWEEN CAST($from_ts AS TIMESTAMP) AND CAST($to_ts AS TIMESTAMP)
   AND event_name = 'page_view'
   {where_site}
 GROUP BY path
 ORDER BY pv DESC
 LIMIT {int(limit)};
 """
-    rows = _sql_query(sql)
-    return [{"path": str(r.get("path", "")), "pv": int(r.get("pv", 0) or 0)} for r in rows]
+    paths, pvs = _columns(_sql_table(sql, params), "path", "pv")
+    return [{"path": str(p or ""), "pv": int(v or 0)} for p, v in zip(paths, pvs)]
 
-def q_error_series(from_iso: str, to_iso: str, bucket_str: str, site_id: Optional[str]=None) -> List[Dict[str, Any]]:
-    bucket_sql = _normalize_bucket(bucket_str)
-    where_site = f"AND site_id = '{_validate_site_id(site_id)}'" if site_id else ""
+def q_error_series(from_iso: str, to_iso: str, bucket_sql: str, site_id: Optional[str]=None) -> List[Dict[str, Any]]:
+    where_site, params = _window_params(from_iso, to_iso, site_id)
     sql = f"""
-SELECT DATE_BIN(INTERVAL '{bucket_sql}', time) AS bucket,
+SELECT DATE_BIN(INTERVAL '{_interval(bucket_sql)}', time) AS bucket,
        SUM(CASE WHEN COALESCE(TRY_CAST(error_flag AS BOOLEAN), false) THEN 1 ELSE 0 END)::BIGINT AS errors,
        COUNT(*)::BIGINT AS total
 FROM "events"
-WHERE time BETWEEN TIMESTAMP '{from_iso}' AND TIMESTAMP '{to_iso}'
+WHERE time BETWEEN CAST($from_ts AS TIMESTAMP) AND CAST($to_ts AS TIMESTAMP)
   {where_site}
 GROUP BY bucket
 ORDER BY bucket;
 """
-    rows = _sql_query(sql)
-    out = []
-    for r in rows:
-        total = int(r.get("total", 0) or 0)
-        errors = int(r.get("errors", 0) or 0)
-        rate = (errors / total) if total else 0.0
-        b = r["bucket"]
-        t = b.isoformat() if hasattr(b, "isoformat") else str(b)
-        out.append({"t": t, "v": rate})
-    return out
-
-def q_sessions(from_iso: str, to_iso: str, site_id: Optional[str]=None) -> int:
-    where_site = f"AND site_id = '{_validate_site_id(site_id)}'" if site_id else ""
-    sql = f"""
-SELECT COUNT(DISTINCT session_id)::BIGINT AS sessions
-FROM "events"
-WHERE time BETWEEN TIMESTAMP '{from_iso}' AND TIMESTAMP '{to_iso}'
-  {where_site};
-"""
-    rows = _sql_query(sql)
-    return int(rows[0].get("sessions", 0) or 0) if rows else 0
+    buckets, errors, totals = _columns(_sql_table(sql, params), "bucket", "errors", "total")
+    return [
+        {"t": b.isoformat(), "v": ((e or 0) / n) if n else 0.0}
+        for b, e, n in zip(buckets, errors, totals)
+    ]
+
+# Funnel steps as bits (landing=1, product=2, checkout=4), OR-ed per session.
+# Every session row is kept (non-funnel rows contribute 0) so the same
+# grouping also yields the distinct session count without a COUNT DISTINCT.
+_FUNNEL_MASK = (
+    "(CASE WHEN event_name IN ('page_view','click') THEN"
+    " (CASE WHEN path = '/' OR path LIKE '/landing%' THEN 1 ELSE 0 END"
+    " | CASE WHEN path LIKE '/products%' THEN 2 ELSE 0 END"
+    " | CASE WHEN path LIKE '/checkout%' OR path LIKE '/cart%' THEN 4 ELSE 0 END)"
+    " ELSE 0 END)"
+)
 
 def q_funnel(from_iso: str, to_iso: str, site_id: Optional[str]=None) -> Dict[str, int]:
-    where_site = f"AND site_id = '{_validate_site_id(site_id)}'" if site_id else ""
+    where_site, params = _window_params(from_iso, to_iso, site_id)
     sql = f"""
 WITH s AS (
   SELECT
     session_id,
-    BOOL_OR(path='/' OR path LIKE '/landing%') AS has_landing,
-    BOOL_OR(path LIKE '/products%') AS has_product,
-    BOOL_OR(path LIKE '/checkout%' OR path LIKE '/cart%') AS has_checkout
+    BIT_OR({_FUNNEL_MASK}) AS mask
   FROM "events"
-  WHERE time BETWEEN TIMESTAMP '{from_iso}' AND TIMESTAMP '{to_iso}'
-    AND event_name IN ('page_view','click')
+  WHERE time BETWEEN CAST($from_ts AS TIMESTAMP) AND CAST($to_ts AS TIMESTAMP)
+    AND session_id IS NOT NULL
     {where_site}
   GROUP BY session_id
 )
 SELECT
-  SUM(CASE WHEN has_landing THEN 1 ELSE 0 END)::BIGINT AS landing_sessions,
-  SUM(CASE WHEN has_product THEN 1 ELSE 0 END)::BIGINT AS product_sessions,
-  SUM(CASE WHEN has_checkout THEN 1 ELSE 0 END)::BIGINT AS checkout_sessions
+  COUNT(*)::BIGINT AS sessions,
+  SUM(CASE WHEN (mask & 1) <> 0 THEN 1 ELSE 0 END)::BIGINT AS landing_sessions,
+  SUM(CASE WHEN (mask & 2) <> 0 THEN 1 ELSE 0 END)::BIGINT AS product_sessions,
+  SUM(CASE WHEN (mask & 4) <> 0 THEN 1 ELSE 0 END)::BIGINT AS checkout_sessions
 FROM s;
 """
-    rows = _sql_query(sql)
-    if not rows:
-        return {"landing": 0, "product": 0, "checkout": 0}
-    r = rows[0]
+    tbl = _sql_table(sql, params)
+    if not tbl.num_rows:
+        return {"landing": 0, "product": 0, "checkout": 0, "sessions": 0}
+    landing, product, checkout, sessions = _columns(
+        tbl, "landing_sessions", "product_sessions", "checkout_sessions", "sessions"
+    )
     return {
-        "landing": int(r.get("landing_sessions", 0) or 0),
-        "product": int(r.get("product_sessions", 0) or 0),
-        "checkout": int(r.get("checkout_sessions", 0) or 0),
+        "landing": int(landing[0] or 0),
+        "product": int(product[0] or 0),
+        "checkout": int(checkout[0] or 0),
+        "sessions": int(sessions[0] or 0),
     }
 
+def q_all(from_iso: str, to_iso: str, bucket_sql: str, site_id: Optional[str]=None, limit: int=10) -> Tuple[
+    List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], int, Dict[str, int]
+]:
+    """Run every digest aggregate in one SQL round-trip.
+
+    One `base` scan of the window feeds all aggregates; rows come back tagged
+    with `kind` and are split client-side. `bucket_sql` is an already
+    normalized interval (see _normalize_bucket). Returns the same shapes as
+    q_pv_series, q_error_series, q_top_paths, sessions and q_funnel.
+    """
+    where_site, params = _window_params(from_iso, to_iso, site_id)
+    sql = f"""
+WITH base AS (
+  SELECT time, path, session_id, event_name, "count", error_flag
+  FROM "events"
+  WHERE time BETWEEN CAST($from_ts AS TIMESTAMP) AND CAST($to_ts AS TIMESTAMP)
+    {where_site}
+),
+s AS (
+  SELECT
+    session_id,
+    BIT_OR({_FUNNEL_MASK}) AS mask
+  FROM base
+  WHERE session_id IS NOT NULL
+  GROUP BY session_id
+)
+SELECT 'pv' AS kind, DATE_BIN(INTERVAL '{_interval(bucket_sql)}', time) AS bucket, CAST(NULL AS VARCHAR) AS path,
+       SUM("count")::BIGINT AS v, 0::BIGINT AS total
+FROM base WHERE event_name = 'page_view' GROUP BY 2
+UNION ALL
+SELECT 'err', DATE_BIN(INTERVAL '{_interval(bucket_sql)}', time), CAST(NULL AS VARCHAR),
+       SUM(CASE WHEN COALESCE(TRY_CAST(error_flag AS BOOLEAN), false) THEN 1 ELSE 0 END)::BIGINT,
+       COUNT(*)::BIGINT
+FROM base GROUP BY 2
+UNION ALL
+SELECT * FROM (
+  SELECT 'top', CAST(NULL AS TIMESTAMP), path, SUM("count")::BIGINT AS v, 0::BIGINT
+  FROM base WHERE event_name = 'page_view'
+  GROUP BY path ORDER BY v DESC LIMIT {int(limit)}
+)
+UNION ALL
+SELECT 'ses', CAST(NULL AS TIMESTAMP), CAST(NULL AS VARCHAR), COUNT(*)::BIGINT, 0::BIGINT FROM s
+UNION ALL
+SELECT 'fun', CAST(NULL AS TIMESTAMP), 'landing', SUM(CASE WHEN (mask & 1) <> 0 THEN 1 ELSE 0 END)::BIGINT, 0::BIGINT FROM s
+UNION ALL
+SELECT 'fun', CAST(NULL AS TIMESTAMP), 'product', SUM(CASE WHEN (mask & 2) <> 0 THEN 1 ELSE 0 END)::BIGINT, 0::BIGINT FROM s
+UNION ALL
+SELECT 'fun', CAST(NULL AS TIMESTAMP), 'checkout', SUM(CASE WHEN (mask & 4) <> 0 THEN 1 ELSE 0 END)::BIGINT, 0::BIGINT FROM s;
+"""
+    kinds, buckets, paths, vs, totals = _columns(_sql_table(sql, params), "kind", "bucket", "path", "v", "total")
+    pv_series: List[Dict[str, Any]] = []
+    err_series: List[Dict[str, Any]] = []
+    top_paths: List[Dict[str, Any]] = []
+    sessions = 0
+    funnel = {"landing": 0, "product": 0, "checkout": 0}
+    for kind, b, path, v, total in zip(kinds, buckets, paths, vs, totals):
+        v = int(v or 0)
+        if kind == "pv":
+            pv_series.append({"t": b.isoformat(), "v": v})
+        elif kind == "err":
+            err_series.append({"t": b.isoformat(), "v": (v / total) if total else 0.0})
+        elif kind == "top":
+            top_paths.append({"path": str(path or ""), "pv": v})
+        elif kind == "ses":
+            sessions = v
+        elif kind == "fun":
+            funnel[str(path)] = v
+    # UNION ALL does not preserve branch order
+    pv_series.sort(key=lambda p: p["t"])
+    err_series.sort(key=lambda p: p["t"])
+    top_paths.sort(key=lambda p: p["pv"], reverse=True)
+    return pv_series, err_series, top_paths, sessions, funnel
+
+def _q_parallel(from_iso: str, to_iso: str, bucket_sql: str, site_id: Optional[str]):
+    """Per-aggregate fallback for engines that reject the unified query."""
+    f_pv  = _POOL.submit(_timed, "q_pv_series",    q_pv_series,    from_iso, to_iso, bucket_sql, site_id)
+    f_err = _POOL.submit(_timed, "q_error_series", q_error_series, from_iso, to_iso, bucket_sql, site_id)
+    f_top = _POOL.submit(_timed, "q_top_paths",    q_top_paths,    from_iso, to_iso, site_id)
+    f_fun = _POOL.submit(_timed, "q_funnel",       q_funnel,       from_iso, to_iso, site_id)
+    funnel = f_fun.result()
+    return f_pv.result(), f_err.result(), f_top.result(), funnel["sessions"], funnel
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Digest 조립
 # ──────────────────────────────────────────────────────────────────────────────
 def build_digest(from_iso: Optional[str], to_iso: Optional[str], bucket: str, site_id: Optional[str]) -> Dict[str, Any]:
-    now = datetime.now(timezone.utc)
-    if not to_iso:
-        to_iso = _iso(now)
-    if not from_iso:
-        from_iso = _iso(now - timedelta(hours=24))
     bucket = (bucket or "1h").lower()
+    # Only a defaulted window needs the clock; explicit ones go straight to the cache
+    if not (from_iso and to_iso):
+        now = datetime.now(timezone.utc)
+        if not to_iso:
+            to_iso = _iso(now)
+        if not from_iso:
+            from_iso = _iso(now - timedelta(hours=24))
 
-    cache_key = f"{from_iso}|{to_iso}|{bucket}|{site_id or ''}"
+    cache_key = "|".join((from_iso, to_iso, bucket, site_id or ""))
     cached = _cache_get(cache_key)
     if cached is not None:
         return cached
 
-    with ThreadPoolExecutor(max_workers=5) as ex:
-        f_pv  = ex.submit(lambda: _timed("q_pv_series",  lambda: q_pv_series(from_iso, to_iso, bucket, site_id)))
-        f_err = ex.submit(lambda: _timed("q_error_series",lambda: q_error_series(from_iso, to_iso, bucket, site_id)))
-        f_top = ex.submit(lambda: _timed("q_top_paths",  lambda: q_top_paths(from_iso, to_iso, site_id)))
-        f_ses = ex.submit(lambda: _timed("q_sessions",   lambda: q_sessions(from_iso, to_iso, site_id)))
-        f_fun = ex.submit(lambda: _timed("q_funnel",     lambda: q_funnel(from_iso, to_iso, site_id)))
-
-        pv_series  = f_pv.result()
-        err_series = f_err.result()
-        top_paths  = f_top.result()
-        sessions   = f_ses.result()
-        funnel_raw = f_fun.result()
+    bucket_sql = _normalize_bucket(bucket)
+    try:
+        pv_series, err_series, top_paths, sessions, funnel_raw = _timed(
+            "q_all", q_all, from_iso, to_iso, bucket_sql, site_id
+        )
+    except ValueError:
+        # invalid site_id: same error on the fallback path, surface it as-is
+        raise
+    except Exception as e:
+        log.warning("[ai] unified digest query failed, falling back to per-aggregate queries: %s", e)
+        pv_series, err_series, top_paths, sessions, funnel_raw = _q_parallel(from_iso, to_iso, bucket_sql, site_id)
 
-    totals_pageviews = int(sum(p.get("v", 0) for p in pv_series)) if pv_series else 0
+    totals_pageviews = int(np.fromiter((p["v"] for p in pv_series), np.int64, count=len(pv_series)).sum())
     users = sessions
     anomalies = _z_scores(pv_series, key="v", z=3.0)
     product = funnel_raw.get("product", 0)
@@ -0,0 +1,87 @@
+"""On-disk cache of raw LLM replies for the AI report.
+AI 리포트 LLM 응답을 디스크에 저장하는 캐시입니다 (AI_REPORT_CACHE_DIR 설정 시에만 사용).
+
+Entries expire after AI_REPORT_CACHE_TTL seconds and the directory is pruned
+to AI_REPORT_CACHE_MAX_FILES on every write.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import AI_REPORT_CACHE_DIR, AI_REPORT_CACHE_MAX_FILES, AI_REPORT_CACHE_TTL
+
+log = logging.getLogger("ai_report")
+
+_DIR: Optional[Path] = Path(AI_REPORT_CACHE_DIR) if AI_REPORT_CACHE_DIR else None
+_TTL = AI_REPORT_CACHE_TTL
+_MAX_FILES = max(1, AI_REPORT_CACHE_MAX_FILES)
+
+
+def enabled() -> bool:
+    return _DIR is not None
+
+
+def get(key: str) -> Optional[str]:
+    if _DIR is None:
+        return None
+    path = _DIR / f"{key}.json"
+    try:
+        if _TTL > 0 and path.stat().st_mtime < time.time() - _TTL:
+            return None
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        log.debug("llm cache read failed: %s", exc)
+        return None
+
+
+def put(key: str, value: str) -> None:
+    if _DIR is None:
+        return
+    try:
+        _DIR.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(value)
+        os.replace(tmp, _DIR / f"{key}.json")
+    except OSError as exc:
+        log.debug("llm cache write failed: %s", exc)
+        return
+    _prune(_DIR)
+
+
+def _prune(directory: Path) -> None:
+    """Drop expired replies, then the oldest ones beyond _MAX_FILES."""
+    cutoff = time.time() - _TTL if _TTL > 0 else None
+    kept: List[Tuple[float, str]] = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                    if cutoff is not None and mtime < cutoff:
+                        os.unlink(entry.path)
+                    else:
+                        kept.append((mtime, entry.path))
+                except FileNotFoundError:
+                    # Another worker pruned it first
+                    continue
+        if len(kept) > _MAX_FILES:
+            kept.sort()
+            for _, path in kept[: len(kept) - _MAX_FILES]:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+    except OSError as exc:
+        log.debug("llm cache prune failed: %s", exc)
@@ -1,21 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict
 from fastapi import APIRouter
 
+from config import AI_REPORT_CONCURRENCY
 from .schemas import ReportRequest, ReportResponse
 from .service import generate_report
 
 
 router = APIRouter()
 
+# Report generation awaits widget fetches and the LLM on the event loop;
+# the semaphore caps how many reports hit the LLM at once.
+_SEM = asyncio.Semaphore(max(1, AI_REPORT_CONCURRENCY))
+
 
 @router.post("/ai-report/generate", response_model=ReportResponse)
-def post_ai_report(req: ReportRequest) -> Dict[str, Any]:
+async def post_ai_report(req: ReportRequest) -> Dict[str, Any]:
     t = req.time
-    data = generate_report(
-        t.from_ts, t.to, t.bucket, t.site_id,
-        prompt=req.prompt, language=req.language, audience=req.audience, word_limit=req.word_limit,
-    )
-    return data
-
+    async with _SEM:
+        return await generate_report(
+            t.from_ts, t.to, t.bucket, t.site_id,
+            prompt=req.prompt, language=req.language, audience=req.audience, word_limit=req.word_limit,
+        )
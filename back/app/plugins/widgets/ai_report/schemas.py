@@ -5,8 +5,14 @@ from typing import Any, Dict, List, Literal, Optional, Union
 from pydantic import BaseModel, ConfigDict, Field
 
 
+# Item models are only validated as part of ReportResponse, whose schema
+# inlines them; defer their standalone core-schema build until first direct use.
+_NESTED = ConfigDict(defer_build=True)
+
+
 class TimeRange(BaseModel):
-    model_config = ConfigDict(populate_by_name=True, ser_json_by_alias=True)
+    # Read-only once parsed (the router only unpacks it)
+    model_config = ConfigDict(populate_by_name=True, ser_json_by_alias=True, frozen=True)
 
     from_ts: Optional[str] = Field(default=None, alias="from", serialization_alias="from")
     to: Optional[str] = None
@@ -15,7 +21,7 @@ class TimeRange(BaseModel):
 
 
 class ReportRequest(BaseModel):
-    time: TimeRange = TimeRange()
+    time: TimeRange = Field(default_factory=TimeRange)
     prompt: str = ""
     language: str = "en"
     audience: str = "product"
@@ -23,6 +29,8 @@ class ReportRequest(BaseModel):
 
 
 class TrafficDiagnosis(BaseModel):
+    model_config = _NESTED
+
     focus: str
     finding: str
     widget: str
@@ -32,6 +40,8 @@ class TrafficDiagnosis(BaseModel):
 
 
 class PageIssue(BaseModel):
+    model_config = _NESTED
+
     page: str
     issue: str
     widget: str
@@ -41,6 +51,8 @@ class PageIssue(BaseModel):
 
 
 class InteractionInsight(BaseModel):
+    model_config = _NESTED
+
     area: str
     insight: str
     widget: str
@@ -48,6 +60,8 @@ class InteractionInsight(BaseModel):
 
 
 class Recommendation(BaseModel):
+    model_config = _NESTED
+
     category: str
     suggestion: str
     rationale: Optional[str] = None
@@ -55,6 +69,8 @@ class Recommendation(BaseModel):
 
 
 class ExpectedMetricChange(BaseModel):
+    model_config = _NESTED
+
     metric: Optional[str] = None
     period: Optional[str] = None
     target: Optional[str] = None
@@ -62,6 +78,8 @@ class ExpectedMetricChange(BaseModel):
 
 
 class PriorityItem(BaseModel):
+    model_config = _NESTED
+
     title: str
     priority: Union[Literal["low", "medium", "high"], str]
     impact: str
@@ -72,6 +90,8 @@ class PriorityItem(BaseModel):
 
 
 class MetricWatch(BaseModel):
+    model_config = _NESTED
+
     metric: str
     widget: str
     reason: str
@@ -80,6 +100,8 @@ class MetricWatch(BaseModel):
 
 
 class Prediction(BaseModel):
+    model_config = _NESTED
+
     metric: str
     baseline: float
     expected: float
@@ -88,12 +110,16 @@ class Prediction(BaseModel):
 
 
 class RadarScoreItem(BaseModel):
+    model_config = _NESTED
+
     axis: Union[Literal["performance", "experience", "growth", "search", "stability"], str]
     score: int
     commentary: Optional[str] = None
 
 
 class TrendMeta(BaseModel):
+    model_config = _NESTED
+
     label: str
     change_pct: float
     momentum_pct: Optional[float] = None
@@ -102,7 +128,7 @@ class TrendMeta(BaseModel):
 
 
 class ReportMeta(BaseModel):
-    model_config = ConfigDict(extra="allow")
+    model_config = ConfigDict(extra="allow", defer_build=True)
 
     provider: str = "unknown"
     model: str = "unknown"
@@ -1,26 +1,36 @@
 from __future__ import annotations
 
 import ast
+import asyncio
+import hashlib
 import json
 import logging
 import re
-from collections import deque
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import httpx
+import orjson
+from cachetools import TTLCache
 
 from config import (
+    AI_REPORT_BUNDLE_TTL,
     AI_REPORT_FETCH_BASE,
     AI_REPORT_LLM_API_KEY,
     AI_REPORT_LLM_ENDPOINT,
+    AI_REPORT_LLM_ENDPOINT_EXPLICIT,
     AI_REPORT_LLM_MAX_TOKENS,
     AI_REPORT_LLM_MODEL,
     AI_REPORT_LLM_PROVIDER,
     AI_REPORT_LLM_TEMPERATURE,
     AI_REPORT_LLM_TIMEOUT_S,
-    is_running_in_docker,
+    AI_REPORT_PROMPT_MAX_BYTES,
+    AI_REPORT_RESULT_TTL,
 )
+from .._llm_common import now_iso as _now_iso, ollama_candidates
+from . import _llm_cache
 from .schemas import ReportResponse
 
 log = logging.getLogger("ai_report")
@@ -46,6 +56,8 @@ RADAR_AXIS_ALIASES = {
     "안정성": "stability",
     "기술안정성": "stability",
 }
+# Every alias and canonical axis name in one table: a single lookup per item
+_AXIS_LOOKUP: Dict[str, str] = {**RADAR_AXIS_ALIASES, **{axis: axis for axis in RADAR_AXIS_ORDER}}
 RADAR_FALLBACK_COMMENTARY = "데이터 부족"
 
 JSON_RETRY_PROMPT = (
@@ -54,13 +66,55 @@ JSON_RETRY_PROMPT = (
     "JSON object that matches the requested schema."
 )
 
-FETCH_BASE = (AI_REPORT_FETCH_BASE or "http://127.0.0.1:8000").rstrip("/")
-_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
-_UNSAFE_NUM_RE = re.compile(r"\b(?:NaN|Infinity|-Infinity)\b")
+# Endpoints from config are already stripped of trailing "/"
+FETCH_BASE = AI_REPORT_FETCH_BASE or "http://127.0.0.1:8000"
+_QUERY_BASE = FETCH_BASE + "/api/query"
+_OPENAI_CHAT_URL = (AI_REPORT_LLM_ENDPOINT or "https://api.openai.com") + "/v1/chat/completions"
+# (floor seconds, connect cap) per call kind; collect shares the LLM budget
+_TIMEOUT_RULES: Dict[str, Tuple[float, float]] = {
+    "llm": (5.0, 10.0),
+    "collect": (5.0, 10.0),
+    "ollama": (10.0, 15.0),
+}
+
+
+@lru_cache(maxsize=4)
+def _timeout_for(kind: str) -> httpx.Timeout:
+    floor, connect_cap = _TIMEOUT_RULES[kind]
+    seconds = max(floor, float(AI_REPORT_LLM_TIMEOUT_S or 60.0))
+    return httpx.Timeout(seconds, connect=min(connect_cap, seconds / 2))
+
+
+# Shared async client: keep-alive sockets to the LLM and the local query API
+# are reused across reports, and widget GETs run concurrently on the event loop.
+# Built lazily so it binds to the loop that first uses it.
+_HTTP_ASYNC: Optional[httpx.AsyncClient] = None
+
 
+def _get_http() -> httpx.AsyncClient:
+    global _HTTP_ASYNC
+    if _HTTP_ASYNC is None:
+        # httpx negotiates Accept-Encoding itself (gzip/deflate, plus br/zstd
+        # when their decoders are installed), so compressed widget and LLM
+        # responses are decoded transparently.
+        _HTTP_ASYNC = httpx.AsyncClient(
+            timeout=_timeout_for("llm"),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=128, keepalive_expiry=30.0),
+        )
+    return _HTTP_ASYNC
+
+
+async def aclose_http_client() -> None:
+    global _HTTP_ASYNC
+    client, _HTTP_ASYNC = _HTTP_ASYNC, None
+    if client is not None:
+        await client.aclose()
 
-def _now_iso() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+# NaN/Infinity tokens and trailing commas, rewritten together in one scan.
+# All tokens are ASCII, so ASCII-mode \b/\s skip Unicode property lookups.
+# String literals are matched first and written back unchanged, so only
+# bare NaN/Infinity tokens and trailing commas outside strings are rewritten.
+_FIXUP_RE = re.compile(r'"(?:[^"\\]|\\[\s\S])*"|-?\b(?:NaN|Infinity)\b|,(\s*[}\]])', re.ASCII)
 
 
 def _resolved_provider() -> str:
@@ -92,9 +146,172 @@ def _resolved_provider() -> str:
     return provider
 
 
-def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
-    base = (AI_REPORT_LLM_ENDPOINT or "https://api.openai.com").rstrip("/")
-    url = base + "/v1/chat/completions"
+class _Breaker:
+    """Per-endpoint circuit breaker.
+
+    After `fail_threshold` consecutive failures an endpoint is skipped for
+    `reset_after` seconds; then a single probe is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+
+    `is_open` is a read-only check for callers that merely want to skip a
+    dead endpoint (prewarm, host probes); only the real request calls
+    `try_acquire`, which claims the half-open probe.
+    """
+
+    def __init__(self, fail_threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.fail_threshold = fail_threshold
+        self.reset_after = reset_after
+        self._state: Dict[str, List[Any]] = {}  # url -> [fail_count, opened_at]
+        self._lock = threading.Lock()
+
+    def is_open(self, url: str) -> bool:
+        """True while the endpoint is cooling down; never changes state."""
+        with self._lock:
+            state = self._state.get(url)
+            return state is not None and state[1] is not None and time.monotonic() - state[1] < self.reset_after
+
+    def try_acquire(self, url: str) -> bool:
+        """Admit a real request; after the cooldown, only the first caller gets the probe."""
+        with self._lock:
+            state = self._state.get(url)
+            if state is None or state[1] is None:
+                return True
+            now = time.monotonic()
+            if now - state[1] >= self.reset_after:
+                state[1] = now  # half-open: one probe per cooldown window
+                return True
+            return False
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            state = self._state.setdefault(url, [0, None])
+            state[0] += 1
+            if state[0] >= self.fail_threshold:
+                state[1] = time.monotonic()
+
+    def record_success(self, url: str) -> None:
+        with self._lock:
+            self._state.pop(url, None)
+
+
+_breaker = _Breaker()
+
+
+_STREAM_STRUCT_RE = re.compile(r'["{}\\]')
+
+
+class _ObjectCloseDetector:
+    """Incremental brace counter over streamed text.
+
+    feed() returns True once the first top-level JSON object has closed, so
+    the caller can stop reading tokens the model keeps generating after it.
+    A balanced span only counts if it decodes as a JSON object; brace-wrapped
+    prose such as "{example}" is skipped and scanning resumes after it.
+    Offsets are global across chunks, so escapes split between chunks work.
+    """
+
+    __slots__ = ("depth", "in_string", "escaped_at", "offset", "start", "chunks")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped_at = -1
+        self.offset = 0
+        self.start = 0
+        self.chunks: List[str] = []
+
+    def _decodes(self, end: int) -> bool:
+        text = "".join(self.chunks)
+        try:
+            obj, stop = _DECODER.raw_decode(text, self.start)
+        except ValueError:
+            return False
+        return isinstance(obj, dict) and stop == end
+
+    def feed(self, chunk: str) -> bool:
+        base = self.offset
+        self.offset += len(chunk)
+        self.chunks.append(chunk)
+        for m in _STREAM_STRUCT_RE.finditer(chunk):
+            pos = base + m.start()
+            if pos == self.escaped_at:
+                continue
+            ch = m.group()
+            if self.in_string:
+                if ch == "\\":
+                    self.escaped_at = pos + 1
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == "{":
+                if not self.depth:
+                    self.start = pos
+                self.depth += 1
+            elif not self.depth:
+                continue  # prose before the object
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "}":
+                self.depth -= 1
+                if not self.depth and self._decodes(pos + 1):
+                    return True
+        return False
+
+
+def _openai_sse_delta(line: str) -> Tuple[bool, str]:
+    if not line.startswith("data:"):
+        return False, ""
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return True, ""
+    event = orjson.loads(data)
+    choice = (event.get("choices") or [{}])[0]
+    return False, _message_content_to_str(choice.get("delta") or {})
+
+
+def _ollama_ndjson_delta(line: str) -> Tuple[bool, str]:
+    event = orjson.loads(line)
+    if not isinstance(event, dict):
+        return False, ""
+    if event.get("error"):
+        raise RuntimeError(str(event["error"]))
+    message = event.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    return bool(event.get("done")), content if isinstance(content, str) else ""
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def _stream_chat(
+    url: str,
+    payload: Dict[str, Any],
+    timeout: httpx.Timeout,
+    parse_line: Callable[[str], Tuple[bool, str]],
+    headers: Optional[Dict[str, str]] = None,
+) -> str:
+    """Accumulate streamed deltas, stopping as soon as the JSON object closes."""
+    parts: List[str] = []
+    detector = _ObjectCloseDetector()
+    # Pre-encode with orjson (bytes out) instead of httpx's stdlib json.dumps
+    body = _dumps_bytes(payload)
+    async with _get_http().stream(
+        "POST", url, headers=headers or _JSON_HEADERS, content=body, timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            done, piece = parse_line(line)
+            if piece:
+                parts.append(piece)
+                if detector.feed(piece):
+                    break  # leaving the block closes the stream
+            if done:
+                break
+    return "".join(parts)
+
+
+async def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
     headers = {"Content-Type": "application/json"}
     api_key = (AI_REPORT_LLM_API_KEY or "").strip()
     if not api_key:
@@ -104,77 +321,211 @@ def _call_openai_compatible(messages: List[Dict[str, str]]) -> str:
         "model": AI_REPORT_LLM_MODEL,
         "messages": messages,
         "response_format": {"type": "json_object"},
+        "stream": True,
     }
     if AI_REPORT_LLM_TEMPERATURE not in (None, ""):
         payload["temperature"] = float(AI_REPORT_LLM_TEMPERATURE)
     if AI_REPORT_LLM_MAX_TOKENS:
         payload["max_tokens"] = int(AI_REPORT_LLM_MAX_TOKENS)
-    timeout_seconds = max(5.0, float(AI_REPORT_LLM_TIMEOUT_S or 60.0))
-    timeout = httpx.Timeout(timeout_seconds, connect=min(10.0, timeout_seconds / 2))
-    with httpx.Client(timeout=timeout) as client:
-        response = client.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-    choice = (data.get("choices") or [{}])[0]
-    message = choice.get("message") or {}
-    return _message_content_to_str(message)
+    if not _breaker.try_acquire(_OPENAI_CHAT_URL):
+        raise RuntimeError("LLM endpoint circuit open")
+    try:
+        content = await _stream_chat(_OPENAI_CHAT_URL, payload, _timeout_for("llm"), _openai_sse_delta, headers)
+    except Exception:
+        _breaker.record_failure(_OPENAI_CHAT_URL)
+        raise
+    _breaker.record_success(_OPENAI_CHAT_URL)
+    return content
+
+
+# Config and runtime markers are fixed for the process lifetime
+_OLLAMA_CANDIDATES = ollama_candidates(AI_REPORT_LLM_ENDPOINT, AI_REPORT_LLM_ENDPOINT_EXPLICIT)
+
+
+def _ollama_options() -> Dict[str, Any]:
+    # Cap generation like max_tokens on the OpenAI path, and stop if the model
+    # starts echoing the prompt's bundle section back.
+    options: Dict[str, Any] = {"stop": ["\n\nWIDGET_API_BUNDLE"]}
+    if AI_REPORT_LLM_MAX_TOKENS:
+        options["num_predict"] = int(AI_REPORT_LLM_MAX_TOKENS)
+    if AI_REPORT_LLM_TEMPERATURE not in (None, ""):
+        options["temperature"] = float(AI_REPORT_LLM_TEMPERATURE)
+    return options
+
 
+_OLLAMA_OPTIONS = _ollama_options()
 
-def _call_ollama_resilient(messages: List[Dict[str, str]]) -> str:
-    candidates: List[str] = []
-    if AI_REPORT_LLM_ENDPOINT:
-        candidates.append(AI_REPORT_LLM_ENDPOINT)
-    if is_running_in_docker():
-        candidates.append("http://ollama:11434")
-    candidates.append("http://localhost:11434")
 
+# (base, json_mode) that last produced a reply; tried first on the next call.
+# Only touched from the event loop, so no lock is needed.
+_ollama_good: Optional[Tuple[str, bool]] = None
+
+
+async def _ollama_chat(base: str, json_mode: bool, messages: List[Dict[str, str]]) -> str:
+    payload: Dict[str, Any] = {
+        "model": AI_REPORT_LLM_MODEL,
+        "messages": messages,
+        "stream": True,
+        "options": _OLLAMA_OPTIONS,
+    }
+    if json_mode:
+        payload["format"] = "json"
+    return await _stream_chat(base + "/api/chat", payload, _timeout_for("ollama"), _ollama_ndjson_delta)
+
+
+def _format_rejected(exc: Exception) -> bool:
+    # Ollama answers 400 when the model/server cannot honour format=json
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (400, 422)
+
+
+async def _first_reachable(bases: Tuple[str, ...]) -> Optional[str]:
+    """Probe candidate hosts concurrently and return the first that answers.
+
+    Only a HEAD is raced, never the chat itself, so a host reachable under
+    two names does not generate the report twice.
+    """
+    client = _get_http()
+
+    async def _probe(base: str) -> str:
+        await client.head(base + "/", timeout=_WARMUP_TIMEOUT)
+        return base
+
+    # Read-only check: the chat loop below claims the half-open probe itself
+    tasks = [asyncio.ensure_future(_probe(base)) for base in bases if not _breaker.is_open(base + "/api/chat")]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                return await fut
+            except Exception:
+                continue
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _call_ollama_resilient(messages: List[Dict[str, str]]) -> str:
+    global _ollama_good
     last_err: Optional[Exception] = None
-    timeout_seconds = max(10.0, float(AI_REPORT_LLM_TIMEOUT_S or 60.0))
-    timeout = httpx.Timeout(timeout_seconds, connect=min(15.0, timeout_seconds / 2))
-    for endpoint in candidates:
-        base = (endpoint or "").rstrip("/")
-        if not base:
+
+    good = _ollama_good
+    failed_base: Optional[str] = None
+    if good is not None and _breaker.try_acquire(good[0] + "/api/chat"):
+        good_url = good[0] + "/api/chat"
+        try:
+            content = await _ollama_chat(good[0], good[1], messages)
+            _breaker.record_success(good_url)
+            if content.strip():
+                return content
+        except Exception as exc:
+            last_err = exc
+            _breaker.record_failure(good_url)
+            # Already checked and tried once; the loop moves on to other hosts
+            failed_base = good[0]
+        # Fall back to the full probe below
+        _ollama_good = None
+
+    order = _OLLAMA_CANDIDATES
+    if len(order) > 1:
+        # Dead hosts cost one short probe in parallel instead of a full
+        # chat timeout each in sequence
+        first = await _first_reachable(order)
+        if first is not None:
+            order = (first,) + tuple(base for base in order if base != first)
+
+    for base in order:
+        if base == failed_base:
             continue
         url = base + "/api/chat"
+        if not _breaker.try_acquire(url):
+            last_err = last_err or RuntimeError(f"circuit open: {url}")
+            continue
+        reached = False
         for json_mode in (True, False):
-            payload: Dict[str, Any] = {"model": AI_REPORT_LLM_MODEL, "messages": messages, "stream": False}
-            if json_mode:
-                payload["format"] = "json"
             try:
-                with httpx.Client(timeout=timeout) as client:
-                    response = client.post(url, json=payload)
-                    response.raise_for_status()
-                    data = response.json()
-                    message = data.get("message") if isinstance(data, dict) else None
-                    content = (message or {}).get("content") if isinstance(message, dict) else None
-                    if isinstance(content, str) and content.strip():
-                        return content
+                content = await _ollama_chat(base, json_mode, messages)
+                reached = True
+                _breaker.record_success(url)
+                if content.strip():
+                    _ollama_good = (base, json_mode)
+                    return content
             except Exception as exc:  # pragma: no cover
                 last_err = exc
-                continue
+                # Plain mode only helps when JSON mode itself was refused;
+                # an unreachable host fails the same way twice.
+                if not _format_rejected(exc):
+                    break
+        if not reached:
+            _breaker.record_failure(url)
     raise RuntimeError(f"Ollama call failed: {last_err}")
 
 
-def _clone_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
-    cloned: List[Dict[str, str]] = []
-    for msg in messages:
-        cloned.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
-    return cloned
+_WARMUP_TIMEOUT = httpx.Timeout(5.0)
 
 
-def _retry_llm_for_json(messages: List[Dict[str, str]], last_content: Optional[str]) -> Optional[str]:
-    retry_msgs = _clone_messages(messages)
+async def _prewarm_llm_connection() -> None:
+    """Seat a keep-alive connection (DNS + TCP/TLS) to the LLM endpoint.
+
+    Runs alongside widget collection so the handshake is hidden behind the
+    bundle fan-out; the real POST then reuses the pooled connection.
+    """
+    provider = _resolved_provider()
+    if provider in {"", "disabled", "none"}:
+        return
+    if provider in {"openai", "openai_compat", "vllm"}:
+        url, probe = _OPENAI_CHAT_URL, _OPENAI_CHAT_URL
+    else:
+        base = _OLLAMA_CANDIDATES[0]
+        url, probe = base + "/api/chat", base + "/"
+    # Read-only: the half-open probe belongs to the real chat request
+    if _breaker.is_open(url):
+        return
+    try:
+        # Any status is fine; only the established connection matters
+        await _get_http().head(probe, timeout=_WARMUP_TIMEOUT)
+    except Exception as exc:
+        log.debug("LLM prewarm failed: %s", exc)
+
+
+def _llm_cache_key(provider: str, messages: List[Dict[str, str]]) -> str:
+    # The widget bundle is embedded in the user message, so hashing the
+    # messages also covers the bundle.
+    h = hashlib.sha256()
+    h.update(f"{provider}|{AI_REPORT_LLM_MODEL}|{AI_REPORT_LLM_TEMPERATURE}|".encode())
+    h.update(orjson.dumps(messages, option=orjson.OPT_SORT_KEYS))
+    return h.hexdigest()
+
+
+async def _call_llm(messages: List[Dict[str, str]]) -> str:
+    """Dispatch to the configured provider, reusing cached deterministic replies."""
+    provider = _resolved_provider()
+    if provider in {"", "disabled", "none"}:
+        raise RuntimeError("LLM disabled")
+    # Only temperature-0 replies are reproducible enough to replay
+    key = _llm_cache_key(provider, messages) if _llm_cache.enabled() and not AI_REPORT_LLM_TEMPERATURE else None
+    if key:
+        # Disk I/O stays off the event loop
+        cached = await asyncio.to_thread(_llm_cache.get, key)
+        if cached is not None:
+            return cached
+    if provider in {"openai", "openai_compat", "vllm"}:
+        content = await _call_openai_compatible(messages)
+    else:
+        content = await _call_ollama_resilient(messages)
+    if key and isinstance(content, str) and content.strip():
+        await asyncio.to_thread(_llm_cache.put, key, content)
+    return content
+
+
+async def _retry_llm_for_json(messages: List[Dict[str, str]], last_content: Optional[str]) -> Optional[str]:
+    # Messages are only read downstream, so sharing the original dicts is safe
+    retry_msgs = list(messages)
     snippet = (last_content or "").strip()
     if snippet:
         retry_msgs.append({"role": "assistant", "content": snippet[:4000]})
     retry_msgs.append({"role": "user", "content": JSON_RETRY_PROMPT})
-    provider = _resolved_provider()
     try:
-        if provider in {"openai", "openai_compat", "vllm"}:
-            return _call_openai_compatible(retry_msgs)
-        if provider == "disabled":
-            raise RuntimeError("LLM disabled")
-        return _call_ollama_resilient(retry_msgs)
+        return await _call_llm(retry_msgs)
     except Exception as exc:  # pragma: no cover
         log.warning("LLM retry failed: %s", exc)
         return None
@@ -202,7 +553,7 @@ def _message_content_to_str(message: Dict[str, Any]) -> str:
     if content is None:
         return ""
     try:
-        return json.dumps(content, ensure_ascii=False)
+        return _dumps_bytes(content).decode()
     except Exception:
         return str(content)
 
@@ -219,36 +570,51 @@ def _strip_code_fence(text: str) -> str:
     return stripped.strip()
 
 
+_STRUCT_RE = re.compile(r'["{}]')
+
+
 def _slice_first_object(text: str) -> Optional[str]:
+    # Jump between structural characters with C-level searches instead of
+    # stepping through every character in Python.
     start = text.find("{")
     if start == -1:
         return None
     depth = 0
-    in_string = False
-    escape = False
-    for idx, ch in enumerate(text[start:], start):
-        if in_string:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == '"':
-                in_string = False
+    pos = start
+    search = _STRUCT_RE.search
+    find = text.find
+    while True:
+        m = search(text, pos)
+        if m is None:
+            return None
+        idx = m.start()
+        ch = text[idx]
+        if ch == '"':
+            # Skip to the closing quote: one preceded by an even run of backslashes
+            q = idx
+            while True:
+                q = find('"', q + 1)
+                if q == -1:
+                    return None
+                bs = q - 1
+                while text[bs] == "\\":
+                    bs -= 1
+                if (q - 1 - bs) % 2 == 0:
+                    break
+            pos = q + 1
+        elif ch == "{":
+            depth += 1
+            pos = idx + 1
         else:
-            if ch == '"':
-                in_string = True
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return text[start : idx + 1]
-    return None
+            depth -= 1
+            if depth == 0:
+                return text[start : idx + 1]
+            pos = idx + 1
 
 
 def _json_dict_or_none(blob: str) -> Optional[Dict[str, Any]]:
     try:
-        data = json.loads(blob)
+        data = orjson.loads(blob)
     except Exception:
         return None
     if isinstance(data, dict):
@@ -270,7 +636,23 @@ def _literal_dict_or_none(blob: str) -> Optional[Dict[str, Any]]:
     return None
 
 
+_PLAIN_SCALARS = (str, int, float, bool, type(None))
+
+
+def _is_plain_jsonable(value: Any) -> bool:
+    # tuple/set are deliberately excluded: they still need converting to lists
+    if isinstance(value, _PLAIN_SCALARS):
+        return True
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_plain_jsonable(v) for k, v in value.items())
+    if isinstance(value, list):
+        return all(_is_plain_jsonable(v) for v in value)
+    return False
+
+
 def _coerce_jsonable(value: Any) -> Any:
+    if _is_plain_jsonable(value):
+        return value
     if isinstance(value, dict):
         return {str(k): _coerce_jsonable(v) for k, v in value.items()}
     if isinstance(value, (list, tuple, set)):
@@ -285,7 +667,7 @@ def _maybe_unwrap_json_string(blob: str) -> Optional[str]:
         return None
     if (blob[0] == '"' and blob[-1] == '"') or (blob[0] == "'" and blob[-1] == "'"):
         try:
-            unwrapped = json.loads(blob)
+            unwrapped = orjson.loads(blob)
         except Exception:
             try:
                 unwrapped = ast.literal_eval(blob)
@@ -296,44 +678,76 @@ def _maybe_unwrap_json_string(blob: str) -> Optional[str]:
     return None
 
 
+# A complete string literal (skipped whole), a bracket, or an unterminated quote
+_BRACKET_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"', re.DOTALL)
+_CLOSER_OF = {"{": "}", "[": "]"}
+
+
 def _maybe_balance_brackets(blob: str) -> Optional[str]:
     stack: List[str] = []
-    in_string = False
-    escape = False
-    for ch in blob:
-        if in_string:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == '"':
-                in_string = False
-            continue
-        if ch == '"':
-            in_string = True
+    for m in _BRACKET_TOKEN_RE.finditer(blob):
+        tok = m.group()
+        if tok[0] == '"':
+            if len(tok) == 1:
+                break  # unterminated string runs to the end of the blob
             continue
-        if ch in "{[":
-            stack.append(ch)
-        elif ch in "}]":
-            if stack and ((stack[-1] == "{" and ch == "}") or (stack[-1] == "[" and ch == "]")):
-                stack.pop()
-            else:
-                return None
+        if tok in _CLOSER_OF:
+            stack.append(tok)
+        elif stack and _CLOSER_OF[stack[-1]] == tok:
+            stack.pop()
+        else:
+            return None
     if not stack:
         return None
-    closing = "".join("}" if opener == "{" else "]" for opener in reversed(stack))
-    return blob + closing
+    return blob + "".join(_CLOSER_OF[opener] for opener in reversed(stack))
+
+
+def _fixup(match: "re.Match[str]") -> str:
+    token = match.group(0)
+    if token[0] == '"':
+        return token
+    closer = match.group(1)
+    return closer if closer is not None else "null"
 
 
 def _sanitize_json_tokens(blob: str) -> str:
-    return _UNSAFE_NUM_RE.sub("null", blob)
+    return _FIXUP_RE.sub(_fixup, blob)
+
+
+# NaN/Infinity decode to None, matching what _sanitize_json_tokens writes
+_DECODER = json.JSONDecoder(parse_constant=lambda _: None)
+
+
+def _raw_decode_first_object(text: str) -> Optional[Dict[str, Any]]:
+    # The C decoder consumes one object and ignores whatever trails it
+    start = text.find("{")
+    if start == -1:
+        return None
+    try:
+        obj, _ = _DECODER.raw_decode(text, start)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) and obj else None
+
+
+def _parse_dict(blob: str) -> Optional[Dict[str, Any]]:
+    return _json_dict_or_none(blob) or _literal_dict_or_none(blob)
 
 
 def _extract_json(text: str) -> Dict[str, Any]:
+    """Best-effort dict from an LLM reply, cheapest stage first.
+
+    1. orjson / raw_decode on the untouched (fence-stripped) text; valid
+       replies never reach the Python-level repairs.
+    2. The same parse after NaN/Infinity and trailing-comma repair, which
+       leaves string literals alone.
+    3. The first balanced object, a JSON document quoted as a string, then
+       bracket balancing.
+    """
     if not isinstance(text, str):
         if isinstance(text, (dict, list)):
             try:
-                text = json.dumps(text, ensure_ascii=False)
+                text = _dumps_bytes(text).decode()
             except Exception:
                 text = str(text)
         else:
@@ -341,134 +755,197 @@ def _extract_json(text: str) -> Dict[str, Any]:
     if not text:
         return {}
 
-    stripped = _strip_code_fence(text)
-    first_object = _slice_first_object(stripped)
-
-    seeds = [stripped]
-    if first_object and first_object not in seeds:
-        seeds.append(first_object)
-
-    seen: set[str] = set()
-    queue: deque[str] = deque(seeds)
-
-    while queue:
-        candidate = queue.popleft()
-        if not candidate:
-            continue
-        candidate = _sanitize_json_tokens(candidate).strip()
-        if candidate in seen:
-            continue
-        seen.add(candidate)
-
-        parsed = _json_dict_or_none(candidate)
+    # Prioritized single pass: each repair is tried at most once, cheapest first.
+    stripped = _strip_code_fence(text).strip()
+    if not stripped:
+        return {}
+    # Untouched text first; the repairs below can only damage valid JSON
+    parsed = _parse_dict(stripped) or _raw_decode_first_object(stripped)
+    if parsed:
+        return parsed
+
+    candidate = _sanitize_json_tokens(stripped)
+    if candidate != stripped:
+        parsed = _parse_dict(candidate) or _raw_decode_first_object(candidate)
         if parsed:
             return parsed
 
-        parsed = _literal_dict_or_none(candidate)
+    first_object = _slice_first_object(candidate)
+    if first_object and first_object != candidate:
+        parsed = _parse_dict(first_object)
         if parsed:
             return parsed
 
-        unwrapped = _maybe_unwrap_json_string(candidate)
-        if unwrapped and unwrapped not in seen:
-            queue.append(unwrapped)
-
-        cleaned = _TRAILING_COMMA_RE.sub(r"\1", candidate)
-        if cleaned != candidate and cleaned not in seen:
-            queue.append(cleaned)
+    unwrapped = _maybe_unwrap_json_string(candidate)
+    if unwrapped:
+        # A JSON document quoted as a string; strictly shorter, so this terminates
+        parsed = _extract_json(unwrapped)
+        if parsed:
+            return parsed
 
-        balanced = _maybe_balance_brackets(candidate)
-        if balanced and balanced not in seen:
-            queue.append(balanced)
+    balanced = _maybe_balance_brackets(first_object or candidate)
+    if balanced:
+        parsed = _parse_dict(balanced)
+        if parsed:
+            return parsed
 
     return {}
 
 
-def _discover_query_endpoints() -> List[str]:
-    """Return GET endpoints under /api/query (best effort)."""
+def _query_router() -> Any:
     try:
-        from fastapi.routing import APIRoute  # type: ignore
         from plugins.router import router as plugins_router  # type: ignore
     except Exception as exc:  # pragma: no cover
         log.warning("router import failed: %s", exc)
-        return []
+        return None
+    return plugins_router
+
+
+def _discover_query_endpoints(plugins_router: Any) -> List[str]:
+    """Return GET endpoints under /api/query (best effort)."""
+    from plugins.router import iter_get_routes  # type: ignore
 
     paths: List[str] = []
-    for route in getattr(plugins_router, "routes", []) or []:
-        if not isinstance(route, APIRoute):
-            continue
-        methods = set(route.methods or [])
-        if "GET" not in methods:
-            continue
-        path = getattr(route, "path", None) or getattr(route, "path_format", None)
-        if not isinstance(path, str):
-            continue
+    for path, _ in iter_get_routes(plugins_router):
         if "/ai-report" in path or "snapshot" in path or "heatmap" in path:
             continue
         paths.append(path)
-    uniq: List[str] = []
-    seen = set()
-    for path in paths:
-        if path not in seen:
-            uniq.append(path)
-            seen.add(path)
-    return uniq
+    # Order-preserving dedupe in one C-level pass
+    return list(dict.fromkeys(paths))
+
+
+# Widget GETs that map onto fixed bundle keys; anything else discovered goes to "misc"
+_SIMPLE_GETS: Tuple[Tuple[str, str, Dict[str, Any]], ...] = (
+    ("browser_share", "/browser-share", {}),
+    ("country_share", "/country-share", {}),
+    ("daily_count", "/daily-count", {}),
+    ("device_share", "/device-share", {}),
+    ("page_exit_rate", "/page-exit-rate", {}),
+    ("time_top_pages", "/time-top-pages", {}),
+    ("top_pages", "/top-pages", {}),
+    ("top_buttons_global", "/top-buttons/global", {}),
+)
+# Server-side batch endpoint (plugins/router.py): one GET runs many widgets
+_BUNDLE_TAIL = "/bundle"
+_KNOWN_TAILS = frozenset(
+    {rel for _, rel, _ in _SIMPLE_GETS} | {"/top-buttons/paths", "/top-buttons/by-path", _BUNDLE_TAIL}
+)
 
 
-def _fetch_json(client: httpx.Client, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[bool, Any]:
+class _RouteIndex(NamedTuple):
+    paths: List[str]
+    tails: frozenset
+    simple: List[Tuple[str, str, str, Dict[str, Any]]]  # (bundle key, tail, url, params)
+    misc: List[Tuple[str, str, str]]  # (misc key, tail, url)
+    want_by_path: bool
+    bundle_url: Optional[str]
+
+
+# Routes never change once a router is built, so the index is keyed on the
+# router object itself (a rebuilt router, e.g. on reload, gets a fresh scan)
+_ROUTE_INDEX: Optional[Tuple[Any, _RouteIndex]] = None
+
+
+def _route_index() -> _RouteIndex:
+    """Discovered routes resolved to ready-to-fetch URLs, built once per router."""
+    global _ROUTE_INDEX
+    router = _query_router()
+    cached = _ROUTE_INDEX
+    if cached is not None and cached[0] is router:
+        return cached[1]
+    base = _QUERY_BASE
+    discovered = _discover_query_endpoints(router) if router is not None else []
+    tails = set()
+    misc: List[Tuple[str, str, str]] = []
+    for full in discovered:
+        # Normalise once: "/api/query/x" -> "/x"; both spellings are indexed
+        tail = full.removeprefix("/api/query") or "/"
+        if not tail.startswith("/"):
+            tail = "/" + tail
+        tails.add(full)
+        tails.add(tail)
+        if tail not in _KNOWN_TAILS:
+            misc.append((tail.strip("/").replace("/", "_") or "root", tail, base + tail))
+    simple = [(key, rel, base + rel, params) for key, rel, params in _SIMPLE_GETS if rel in tails]
+    want_by_path = "/top-buttons/paths" in tails and "/top-buttons/by-path" in tails
+    bundle_url = base + _BUNDLE_TAIL if _BUNDLE_TAIL in tails else None
+    index = _RouteIndex(discovered, frozenset(tails), simple, misc, want_by_path, bundle_url)
+    if discovered:
+        # an empty result usually means the router import failed; retry next time
+        _ROUTE_INDEX = (router, index)
+    return index
+
+
+async def _fetch_json(client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[bool, Any]:
     try:
-        response = client.get(url, params=params or {})
+        response = await client.get(url, params=params or {}, timeout=_timeout_for("collect"))
         response.raise_for_status()
-        return True, response.json()
+        # Parsed later by _parse_payload, once the caller knows it wants the body
+        return True, response.content
     except Exception as exc:
         return False, {"error": str(exc), "url": url}
 
 
-def _collect_widget_data() -> Dict[str, Any]:
-    base = FETCH_BASE.rstrip("/") + "/api/query"
+def _parse_payload(raw: bytes) -> Tuple[bool, Any]:
+    body = raw.lstrip()
+    if not body:
+        return True, {}
+    # Widgets answer with objects or arrays; skip the parser for anything else
+    if body[:1] not in (b"{", b"["):
+        return False, {"error": "non-JSON payload", "head": body[:80].decode("utf-8", "replace")}
+    try:
+        return True, orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        return False, {"error": str(exc)}
+
+
+# First /top-buttons/paths candidate from the previous collection; paths
+# rarely churn, so by-path is prefetched with it (event-loop only, no lock).
+_last_sample_path: Optional[str] = None
+
+
+async def _collect_widget_data() -> Dict[str, Any]:
+    base = _QUERY_BASE
     data: Dict[str, Any] = {"_meta": {"base": base}}
-    timeout_seconds = max(5.0, float(AI_REPORT_LLM_TIMEOUT_S or 60.0))
-    timeout = httpx.Timeout(timeout_seconds, connect=min(10.0, timeout_seconds / 2))
-    with httpx.Client(timeout=timeout) as client:
-        discovered = _discover_query_endpoints()
-        tails = set()
-        for path in discovered:
-            if path.startswith("/api/query"):
-                tails.add(path[len("/api/query"):] or "/")
-            tails.add(path)
-        data["_meta"]["discovered"] = discovered
-
-        def _shrink(payload: Any) -> Any:
-            if isinstance(payload, dict):
-                trimmed = dict(payload)
-                rows = trimmed.get("rows")
-                if isinstance(rows, list) and len(rows) > 50:
-                    trimmed["rows"] = rows[:50]
-                buckets = trimmed.get("buckets")
-                if isinstance(buckets, list) and len(buckets) > 60:
-                    trimmed["buckets"] = buckets[:60]
-                return trimmed
-            return payload
-
-        simple_gets = [
-            ("browser_share", "/browser-share", {}),
-            ("country_share", "/country-share", {}),
-            ("daily_count", "/daily-count", {}),
-            ("device_share", "/device-share", {}),
-            ("page_exit_rate", "/page-exit-rate", {}),
-            ("time_top_pages", "/time-top-pages", {}),
-            ("top_pages", "/top-pages", {}),
-            ("top_buttons_global", "/top-buttons/global", {}),
-        ]
-        for key, rel, params in simple_gets:
-            if rel in tails or ("/api/query" + rel) in tails:
-                ok, payload = _fetch_json(client, base + rel, params)
-                data[key] = _shrink(payload) if ok else {"_fail": payload}
-
-        if (
-            ("/top-buttons/paths" in tails or "/api/query/top-buttons/paths" in tails)
-            and ("/top-buttons/by-path" in tails or "/api/query/top-buttons/by-path" in tails)
-        ):
-            ok_paths, paths_payload = _fetch_json(client, base + "/top-buttons/paths", {})
+    routes = _route_index()
+    data["_meta"]["discovered"] = list(routes.paths)
+
+    def _shrink(payload: Any) -> Any:
+        if isinstance(payload, dict):
+            trimmed = dict(payload)
+            rows = trimmed.get("rows")
+            if isinstance(rows, list) and len(rows) > 50:
+                trimmed["rows"] = rows[:50]
+            buckets = trimmed.get("buckets")
+            if isinstance(buckets, list) and len(buckets) > 60:
+                trimmed["buckets"] = buckets[:60]
+            return trimmed
+        return payload
+
+    def _settle(result: Any) -> Any:
+        if isinstance(result, BaseException):
+            return {"_fail": {"error": str(result) or type(result).__name__}}
+        ok, payload = result
+        if ok:
+            ok, payload = _parse_payload(payload)
+        return _shrink(payload) if ok else {"_fail": payload}
+
+    client = _get_http()
+
+    def _fetch_by_path(path: str) -> Awaitable[Tuple[bool, Any]]:
+        return _fetch_json(client, base + "/top-buttons/by-path", {"path": path, "range": "7d"})
+
+    async def _by_path() -> Any:
+        # by-path needs the first path candidate. The previous run's candidate
+        # is fetched speculatively alongside /paths and kept when it still
+        # matches, so the usual case costs one round trip instead of two.
+        global _last_sample_path
+        guess = _last_sample_path
+        speculative = asyncio.ensure_future(_fetch_by_path(guess)) if guess else None
+        try:
+            ok_paths, paths_payload = await _fetch_json(client, base + "/top-buttons/paths", {})
+            if ok_paths:
+                ok_paths, paths_payload = _parse_payload(paths_payload)
             sample_path = None
             if ok_paths and isinstance(paths_payload, dict):
                 candidates = paths_payload.get("paths") or paths_payload.get("rows") or []
@@ -478,89 +955,286 @@ def _collect_widget_data() -> Dict[str, Any]:
                         sample_path = first
                     elif isinstance(first, dict):
                         sample_path = first.get("path")
-            if sample_path:
-                ok_btn, btn_payload = _fetch_json(
-                    client, base + "/top-buttons/by-path", {"path": sample_path, "range": "7d"}
-                )
-                data["top_buttons_by_path"] = _shrink(btn_payload) if ok_btn else {"_fail": btn_payload}
+            if not sample_path:
+                return None
+            _last_sample_path = sample_path
+            if speculative is not None and sample_path == guess:
+                return await speculative
+        finally:
+            if speculative is not None and not speculative.done():
+                speculative.cancel()
+        return await _fetch_by_path(sample_path)
+
+    async def _fetch_each(entries: List[Tuple[str, str, Dict[str, Any]]]) -> List[Any]:
+        results = await asyncio.gather(
+            *(_fetch_json(client, url, params) for _, url, params in entries), return_exceptions=True
+        )
+        return [_settle(result) for result in results]
+
+    async def _fetch_widgets(entries: List[Tuple[str, str, Dict[str, Any]]]) -> List[Any]:
+        """Settled payload per (tail, url, params) entry, in order.
+
+        Default-parameter widgets go through the server's /bundle endpoint in
+        one round trip; anything it cannot run falls back to its own GET.
+        """
+        batch = [i for i, (_, _, params) in enumerate(entries) if not params] if routes.bundle_url else []
+        if not batch:
+            return await _fetch_each(entries)
+        ok, body = await _fetch_json(
+            client, routes.bundle_url, {"widgets": ",".join(entries[i][0] for i in batch)}
+        )
+        if ok:
+            ok, body = _parse_payload(body)
+        if not ok or not isinstance(body, dict):
+            return await _fetch_each(entries)
+        got = body.get("widgets") or {}
+        errors = body.get("errors") or {}
+        out: List[Any] = [None] * len(entries)
+        retry: List[int] = []
+        batched = set(batch)
+        for i, (tail, url, _) in enumerate(entries):
+            if i in batched and tail in got:
+                out[i] = _shrink(got[tail])
+            elif i in batched and tail in errors and errors[tail] != "unsupported":
+                out[i] = {"_fail": {"error": errors[tail], "url": url}}
             else:
-                data["top_buttons_by_path"] = {"_skip": "no path candidates"}
-
-        known = {rel for _, rel, _ in simple_gets} | {"/top-buttons/paths", "/top-buttons/by-path"}
-        misc: Dict[str, Any] = {}
-        for full in discovered:
-            tail = full
-            if tail.startswith("/api/query"):
-                tail = tail[len("/api/query"):]
-            if not tail.startswith("/"):
-                tail = "/" + tail
-            if tail in known:
-                continue
-            ok, payload = _fetch_json(client, base + tail, {})
-            key = tail.strip("/").replace("/", "_") or "root"
-            misc[key] = _shrink(payload) if ok else {"_fail": payload}
-        if misc:
-            data["misc"] = misc
+                retry.append(i)
+        if retry:
+            for i, settled in zip(retry, await _fetch_each([entries[i] for i in retry])):
+                out[i] = settled
+        return out
+
+    # Submit every widget fetch (and the by-path chain) first, then collect.
+    # Results keep submission order, so the bundle layout stays deterministic.
+    entries = [(tail, url, params) for _, tail, url, params in routes.simple]
+    entries += [(tail, url, {}) for _, tail, url in routes.misc]
+    want_by_path = routes.want_by_path
+    settled, by_path = await asyncio.gather(
+        _fetch_widgets(entries),
+        _by_path() if want_by_path else asyncio.sleep(0),
+        return_exceptions=True,
+    )
+    if isinstance(settled, BaseException):
+        settled = [_settle(settled)] * len(entries)
+    n_simple = len(routes.simple)
+    for (key, _, _, _), value in zip(routes.simple, settled):
+        data[key] = value
+
+    if want_by_path:
+        data["top_buttons_by_path"] = (
+            {"_skip": "no path candidates"} if by_path is None else _settle(by_path)
+        )
+
+    misc: Dict[str, Any] = {}
+    for (key, _, _), value in zip(routes.misc, settled[n_simple:]):
+        misc[key] = value
+    if misc:
+        data["misc"] = misc
     return data
 
 
-def _build_messages(bundle: Dict[str, Any], prompt: str, language: str, audience: str, word_limit: int) -> List[Dict[str, str]]:
-    schema_hint = {
-        "generated_at": "ISO8601 string",
-        "title": "AI 리포트",
-        "summary": "string",
-        "diagnostics": [{"focus": "모바일Chrome", "finding": "string", "widget": "device_share", "severity": "High"}],
-        "page_issues": [{"page": "/checkout", "issue": "string", "widget": "page_exit_rate"}],
-        "interaction_insights": [{"area": "CTA 버튼", "insight": "string", "widget": "top_buttons_global"}],
-        "ux_recommendations": [{"category": "UX", "suggestion": "string"}],
-        "tech_recommendations": [{"category": "Tech", "suggestion": "string"}],
-        "priorities": [{"title": "string", "priority": "High|Medium|Low", "impact": "string"}],
-        "metrics_to_track": [{"metric": "page_exit_rate", "widget": "page_exit_rate"}],
-        "predictions": [{"metric": "전환율", "baseline": 2.1, "expected": 2.6, "unit": "%"}],
-        "radar_scores": [{"axis": "performance|experience|growth|search|stability", "score": 60}],
-        "meta": {"prompt_version": "v2"},
-    }
+# Recently collected bundles keyed by (query base, discovered routes). Widget
+# data is bucketed, so a retry or refresh within the TTL reuses the last fan-out.
+# Callers must treat cached bundles as read-only.
+_BUNDLE_CACHE: TTLCache = TTLCache(maxsize=8, ttl=max(AI_REPORT_BUNDLE_TTL, 1e-3))
+_bundle_inflight: Dict[Tuple[Any, ...], asyncio.Future] = {}
+
+
+async def _collect_and_cache(key: Tuple[Any, ...]) -> Dict[str, Any]:
+    bundle = await _collect_widget_data()
+    _BUNDLE_CACHE[key] = bundle
+    return bundle
+
+
+async def _cached_widget_data() -> Dict[str, Any]:
+    if AI_REPORT_BUNDLE_TTL <= 0:
+        return await _collect_widget_data()
+    key = (_QUERY_BASE, tuple(_route_index().paths))
+    bundle = _BUNDLE_CACHE.get(key)
+    if bundle is not None:
+        return bundle
+    # Single-flight: concurrent reports share one fan-out (no await between
+    # the check and the set, so this is atomic on the event loop)
+    task = _bundle_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_collect_and_cache(key))
+        _bundle_inflight[key] = task
+        task.add_done_callback(lambda _: _bundle_inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+# Finished LLM reports keyed by the whole request; fallbacks are never stored
+_REPORT_CACHE: TTLCache = TTLCache(maxsize=128, ttl=max(AI_REPORT_RESULT_TTL, 1e-3))
+
+
+def _report_cache_key(*parts: Any, prompt: str) -> Tuple[Any, ...]:
+    # Hash the free-text prompt so long prompts don't bloat the key
+    return (*parts, hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest())
+
+
+# Static prompt parts, serialized once at import
+_SCHEMA_HINT = {
+    "generated_at": "ISO8601 string",
+    "title": "AI 리포트",
+    "summary": "string",
+    "diagnostics": [{"focus": "모바일Chrome", "finding": "string", "widget": "device_share", "severity": "High"}],
+    "page_issues": [{"page": "/checkout", "issue": "string", "widget": "page_exit_rate"}],
+    "interaction_insights": [{"area": "CTA 버튼", "insight": "string", "widget": "top_buttons_global"}],
+    "ux_recommendations": [{"category": "UX", "suggestion": "string"}],
+    "tech_recommendations": [{"category": "Tech", "suggestion": "string"}],
+    "priorities": [{"title": "string", "priority": "High|Medium|Low", "impact": "string"}],
+    "metrics_to_track": [{"metric": "page_exit_rate", "widget": "page_exit_rate"}],
+    "predictions": [{"metric": "전환율", "baseline": 2.1, "expected": 2.6, "unit": "%"}],
+    "radar_scores": [{"axis": "performance|experience|growth|search|stability", "score": 60}],
+    "meta": {"prompt_version": "v2"},
+}
+# Compact like the bundle dump; orjson keeps Korean text unescaped
+_SCHEMA_HINT_JSON = orjson.dumps(_SCHEMA_HINT).decode()
+_SYSTEM_PROMPT = (
+    "You are a senior analytics engineer. Return STRICT JSON ONLY that matches the schema. "
+    "No preface, no markdown, no extra text. Reply in Korean when language=ko."
+)
 
-    system_prompt = (
-        "You are a senior analytics engineer. Return STRICT JSON ONLY that matches the schema. "
-        "No preface, no markdown, no extra text. Reply in Korean when language=ko."
-    )
+
+def _dumps_bytes(value: Any) -> bytes:
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        # orjson rejects non-str keys / >64-bit ints that stdlib json accepts
+        return json.dumps(value, ensure_ascii=False).encode()
+
+
+def _dumps_bundle(bundle: Dict[str, Any]) -> str:
+    return _dumps_bytes(bundle).decode()
+
+
+_PROMPT_STR_MAX = 2000
+_PROMPT_ROWS_MAX = 20
+# Any other list, at any depth (buckets, nested series, ...)
+_PROMPT_LIST_MAX = 30
+# Long numeric series keep only this many points at each end
+_PROMPT_SERIES_EDGE = 5
+_PROMPT_DEPTH_MAX = 6
+# Bookkeeping fields that cost prompt tokens without telling the model anything
+_PROMPT_NOISE_KEYS = frozenset({"id", "created_at", "updated_at", "raw"})
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _clamp_value(value: Any, depth: int = 0, limit: int = _PROMPT_LIST_MAX) -> Any:
+    if isinstance(value, str):
+        return value[:_PROMPT_STR_MAX] + "…" if len(value) > _PROMPT_STR_MAX else value
+    if isinstance(value, float):
+        return round(value, 3)
+    if isinstance(value, (list, dict)) and depth >= _PROMPT_DEPTH_MAX:
+        return f"…({len(value)} items)"
+    if isinstance(value, list):
+        if len(value) > limit and all(_is_number(v) for v in value):
+            # A long series reads as its size plus both ends
+            edge = _PROMPT_SERIES_EDGE
+            return {
+                "len": len(value),
+                "head": [_clamp_value(v) for v in value[:edge]],
+                "tail": [_clamp_value(v) for v in value[-edge:]],
+            }
+        return [_clamp_value(v, depth + 1) for v in value[:limit]]
+    if isinstance(value, dict):
+        out: Dict[Any, Any] = {}
+        for k, v in value.items():
+            if v is None or k in _PROMPT_NOISE_KEYS:
+                continue
+            if k == "_fail":
+                # Keep only the error text; drop failures that carry none
+                err = v.get("error") if isinstance(v, dict) else v
+                if not err:
+                    continue
+                v = str(err)
+            out[k] = _clamp_value(v, depth + 1, _PROMPT_ROWS_MAX if k == "rows" else _PROMPT_LIST_MAX)
+        return out
+    return value
+
+
+def _clamp_bundle_for_prompt(bundle: Dict[str, Any], max_bytes: int = AI_REPORT_PROMPT_MAX_BYTES) -> Dict[str, Any]:
+    """Minify the bundle for the prompt and, if still over budget, drop the largest misc entries.
+
+    Keeps only `_meta.base`, strips bookkeeping keys and nulls, caps rows at
+    20 and other lists at 30 (long numeric series become len/head/tail),
+    stops descending after 6 levels, rounds floats to 3 decimals and
+    truncates long strings.
+    """
+    meta = bundle.get("_meta")
+    if isinstance(meta, dict):
+        bundle = {**bundle, "_meta": {"base": meta.get("base")}}
+    clamped = _clamp_value(bundle)
+    misc = clamped.get("misc")
+    if max_bytes <= 0 or not isinstance(misc, dict) or not misc:
+        return clamped
+    total = len(_dumps_bytes(clamped))
+    if total > max_bytes:
+        sizes = sorted(((len(_dumps_bytes(v)), k) for k, v in misc.items()), reverse=True)
+        for size, key in sizes:
+            if total <= max_bytes:
+                break
+            del misc[key]
+            total -= size
+        if not misc:
+            del clamped["misc"]
+    return clamped
+
+
+# Messages are read-only downstream, so one system message dict is shared
+_SYSTEM_MESSAGE: Dict[str, str] = {"role": "system", "content": _SYSTEM_PROMPT}
+
+# Everything after the per-request header lines is static except the bundle
+_USER_TEMPLATE_BODY = (
+    "Build an AI report that does the following:\n"
+    "- `diagnostics`: 2~4 핵심 환경별 문제를 위젯 데이터를 근거로 설명.\n"
+    "- `page_issues`: 체류 시간 대비 이탈이 높은 페이지만 골라 가설을 작성.\n"
+    "- `interaction_insights`: 버튼/클릭 패턴을 기반으로 개선 방향을 제안.\n"
+    "- `ux_recommendations`: 즉시 실행 가능한 UX 조치와 검증 방법을 제시.\n"
+    "- `tech_recommendations`: 기술 조치와 추적 방법을 명시.\n"
+    "- `priorities`: 노력 대비 효과 기준으로 High/Medium/Low 분류.\n"
+    "- `metrics_to_track`: 개선 후 7일간 모니터링할 위젯과 목표 변화를 명확히 기재.\n"
+    "- `predictions`: 조치 실행 시 baseline 대비 expected 값을 숫자로 제시.\n"
+    "- `radar_scores`: five axes 0-100 점수, 서로 다른 지표 근거 사용.\n\n"
+    "Respond with JSON only, conforming to this schema:\n"
+    + _SCHEMA_HINT_JSON
+    + "\n\nWIDGET_API_BUNDLE:\n"
+)
+
+
+def _build_messages(bundle: Dict[str, Any], prompt: str, language: str, audience: str, word_limit: int) -> List[Dict[str, str]]:
     soft_prompt = (prompt or "").strip()[:400]
-    user_prompt = (
+    user_prompt = "".join((
         f"Language: {language}\n"
         f"Audience: {audience}\n"
         f"WordLimit: {word_limit}\n"
-        f"UserHint(LightlyIncorporate): {soft_prompt}\n\n"
-        "Build an AI report that does the following:\n"
-        "- `diagnostics`: 2~4 핵심 환경별 문제를 위젯 데이터를 근거로 설명.\n"
-        "- `page_issues`: 체류 시간 대비 이탈이 높은 페이지만 골라 가설을 작성.\n"
-        "- `interaction_insights`: 버튼/클릭 패턴을 기반으로 개선 방향을 제안.\n"
-        "- `ux_recommendations`: 즉시 실행 가능한 UX 조치와 검증 방법을 제시.\n"
-        "- `tech_recommendations`: 기술 조치와 추적 방법을 명시.\n"
-        "- `priorities`: 노력 대비 효과 기준으로 High/Medium/Low 분류.\n"
-        "- `metrics_to_track`: 개선 후 7일간 모니터링할 위젯과 목표 변화를 명확히 기재.\n"
-        "- `predictions`: 조치 실행 시 baseline 대비 expected 값을 숫자로 제시.\n"
-        "- `radar_scores`: five axes 0-100 점수, 서로 다른 지표 근거 사용.\n\n"
-        "Respond with JSON only, conforming to this schema:\n"
-        f"{json.dumps(schema_hint, ensure_ascii=False)}\n\n"
-        f"WIDGET_API_BUNDLE:\n{json.dumps(bundle, ensure_ascii=False)}"
-    )
-    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+        f"UserHint(LightlyIncorporate): {soft_prompt}\n\n",
+        _USER_TEMPLATE_BODY,
+        _dumps_bundle(bundle),
+    ))
+    return [_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}]
 
 
 def _normalize_radar_axis(value: Any) -> Optional[str]:
     if not isinstance(value, str):
         return None
-    cleaned = value.strip().lower().replace(" ", "")
-    if not cleaned:
-        return None
-    return RADAR_AXIS_ALIASES.get(cleaned, cleaned if cleaned in RADAR_AXIS_ORDER else None)
+    cleaned = value.strip().lower()
+    if " " in cleaned:
+        cleaned = cleaned.replace(" ", "")
+    return _AXIS_LOOKUP.get(cleaned)
 
 
 def _normalize_radar_scores(payload: Dict[str, Any]) -> None:
     raw_scores = payload.get("radar_scores")
     items = raw_scores if isinstance(raw_scores, list) else []
-    normalized: Dict[str, Dict[str, Any]] = {}
+    # Seed every axis with the default; the first valid LLM item per axis overwrites it
+    normalized: Dict[str, Dict[str, Any]] = {
+        axis: {"axis": axis, "score": 50, "commentary": RADAR_FALLBACK_COMMENTARY} for axis in RADAR_AXIS_ORDER
+    }
+    filled = set()
 
     for item in items:
         if not isinstance(item, dict):
@@ -573,8 +1247,9 @@ def _normalize_radar_scores(payload: Dict[str, Any]) -> None:
         )
         for candidate in candidates:
             axis_key = _normalize_radar_axis(candidate)
-            if not axis_key or axis_key in normalized:
+            if not axis_key or axis_key in filled:
                 continue
+            filled.add(axis_key)
             score_raw = item.get("score")
             try:
                 score_val = int(float(score_raw))
@@ -588,9 +1263,6 @@ def _normalize_radar_scores(payload: Dict[str, Any]) -> None:
                 "score": score_val,
                 "commentary": commentary_text or RADAR_FALLBACK_COMMENTARY,
             }
-    for axis in RADAR_AXIS_ORDER:
-        if axis not in normalized:
-            normalized[axis] = {"axis": axis, "score": 50, "commentary": RADAR_FALLBACK_COMMENTARY}
     payload["radar_scores"] = [normalized[axis] for axis in RADAR_AXIS_ORDER]
 
 
@@ -637,18 +1309,134 @@ def _sanitize_metrics(payload: Dict[str, Any]) -> None:
     payload["metrics_to_track"] = cleaned
 
 
-def _fallback_report(bundle: Dict[str, Any]) -> Dict[str, Any]:
-    def _first_row(payload: Any) -> Dict[str, Any]:
-        if not isinstance(payload, dict):
-            return {}
-        for key in ("rows", "data", "buckets"):
-            rows = payload.get(key)
-            if isinstance(rows, list):
-                for entry in rows:
-                    if isinstance(entry, dict):
-                        return entry
+def _first_row(payload: Any) -> Dict[str, Any]:
+    if not isinstance(payload, dict):
         return {}
+    for key in ("rows", "data", "buckets"):
+        rows = payload.get(key)
+        if isinstance(rows, list):
+            entry = next((e for e in rows if isinstance(e, dict)), None)
+            if entry is not None:
+                return entry
+    return {}
+
+
+def _heatmap_area(row: Any) -> str:
+    if not isinstance(row, dict):
+        return ""
+    return next(
+        (v.strip() for v in map(row.get, ("label", "area", "path", "button", "name")) if isinstance(v, str) and v.strip()),
+        "",
+    )
+
+
+# Static fallback report: filled per call by _fallback_report. The nested
+# lists are shared and read-only; _finalize_report rebuilds what it touches.
+# None marks the per-call fields (kept in place to preserve key order).
+_FALLBACK_PAGE_ISSUE: Dict[str, Any] = {
+    "page": None,
+    "issue": "체류 시간이 짧고 이탈률이 높습니다.",
+    "dwell_time": None,
+    "exit_rate": None,
+    "insight": "CTA 위계를 단순화하고 핵심 콘텐츠를 상단에 배치하세요.",
+    "widget": "time_top_pages",
+}
+_FALLBACK_INTERACTION: Dict[str, Any] = {
+    "area": None,
+    "insight": "히트맵 상위 버튼이 전체 클릭의 60% 이상을 차지합니다.",
+    "action": "서브 CTA를 축소하고 터치 영역을 넓혀 클릭 미스를 줄이세요.",
+    "widget": "top_buttons_by_path",
+}
+_FALLBACK_TEMPLATE: Dict[str, Any] = {
+    "generated_at": None,
+    "title": "AI 리포트",
+    "summary": "LLM 호출 실패로 규칙 기반 리포트를 제공합니다.",
+    "diagnostics": [
+        {
+            "focus": "모바일 Chrome",
+            "finding": "전체 트래픽의 절반을 차지하지만 이탈률이 높습니다.",
+            "widget": "device_share",
+            "severity": "High",
+            "share": "≈50%",
+            "insight": "모바일 번들 로딩 지연 여부를 먼저 확인하세요.",
+        },
+        {
+            "focus": "Desktop Safari",
+            "finding": "세션 규모는 작지만 전환 저하에 기여합니다.",
+            "widget": "browser_share",
+            "severity": "Medium",
+            "share": "≈12%",
+            "insight": "브라우저 호환성 오류 로그를 확인하세요.",
+        },
+    ],
+    "page_issues": None,
+    "interaction_insights": None,
+    "ux_recommendations": [
+        {
+            "category": "UX",
+            "suggestion": "결제 페이지 요약 영역을 상단으로 올리고 버튼 대비를 강화합니다.",
+            "rationale": "상위 페이지 중 결제 단계 체류 시간이 가장 짧습니다.",
+            "validation": "time_top_pages 위젯으로 7일간 평균 체류 시간을 추적",
+        }
+    ],
+    "tech_recommendations": [
+        {
+            "category": "Tech",
+            "suggestion": "모바일 번들을 분할하고 이미지 lazy-load를 적용합니다.",
+            "rationale": "모바일 Chrome 로그 대비 이탈률이 커서 로딩 병목이 의심됩니다.",
+            "validation": "daily_count·device_share 지표와 LCP 계측을 비교",
+        }
+    ],
+    "priorities": [
+        {
+            "title": "모바일 Chrome 로딩 속도 개선",
+            "priority": "High",
+            "impact": "이탈률 10%p 감소 시 전환율 +5% 기대",
+            "effort": "Medium",
+            "expected_metric_change": {"metric": "page_exit_rate", "period": "7d", "target": "-10%"},
+            "business_outcome": "모바일 매출 손실 방지",
+        },
+        {
+            "title": "결제 CTA 시각적 위계 정비",
+            "priority": "Medium",
+            "impact": "체류시간 +15% 기대",
+            "effort": "Low",
+            "expected_metric_change": {"metric": "avg_time_on_page", "period": "7d", "target": "+15%"},
+            "business_outcome": "완료율 +3% 예상",
+        },
+    ],
+    "metrics_to_track": [
+        {
+            "metric": "page_exit_rate",
+            "widget": "page_exit_rate",
+            "reason": "이탈 감소 여부 확인",
+            "target_change": "-10%",
+            "timeframe": "7d",
+        },
+        {
+            "metric": "time_on_page",
+            "widget": "time_top_pages",
+            "reason": "UX 개선 검증",
+            "target_change": "+15%",
+            "timeframe": "7d",
+        },
+    ],
+    "predictions": [
+        {"metric": "전환율", "baseline": 2.3, "expected": 2.8, "unit": "%", "narrative": "모바일 이탈 10%p 감소 시"},
+        {"metric": "일일 로그 수", "baseline": 1800, "expected": 1950, "unit": "sessions", "narrative": "유입 부족 보완"},
+    ],
+    "radar_scores": [
+        {"axis": "performance", "score": 58, "commentary": "모바일 번들 최적화 필요"},
+        {"axis": "experience", "score": 62, "commentary": "CTA 집중도가 높아 혼선 발생"},
+        {"axis": "growth", "score": 54, "commentary": "일일 로그 상승이 정체됨"},
+        {"axis": "search", "score": 66, "commentary": "검색 유입은 안정적"},
+        {"axis": "stability", "score": 70, "commentary": "오류 로그는 낮음"},
+    ],
+    "meta": {"mode": "fallback", "prompt_version": "v2", "source": "router_scan"},
+}
 
+
+def _fallback_report(bundle: Dict[str, Any]) -> Dict[str, Any]:
     top_page = _first_row(bundle.get("top_pages"))
     high_exit = _first_row(bundle.get("page_exit_rate"))
     heatmap = _first_row(bundle.get("top_buttons_by_path"))
@@ -659,121 +1447,16 @@ def _fallback_report(bundle: Dict[str, Any]) -> Dict[str, Any]:
     exit_rate = high_exit.get("exit_rate") or high_exit.get("ratio")
     exit_text = f"{exit_rate}%" if isinstance(exit_rate, (int, float)) else (exit_rate or "높은 이탈률")
 
-    def _heatmap_area(row: Any) -> str:
-        if not isinstance(row, dict):
-            return ""
-        for key in ("label", "area", "path", "button", "name"):
-            value = row.get(key)
-            if isinstance(value, str) and value.strip():
-                return value.strip()
-        return ""
-
     heatmap_area = _heatmap_area(heatmap) or "주요 CTA 버튼"
 
-    report = {
+    return {
+        **_FALLBACK_TEMPLATE,
         "generated_at": _now_iso(),
-        "title": "AI 리포트",
-        "summary": "LLM 호출 실패로 규칙 기반 리포트를 제공합니다.",
-        "diagnostics": [
-            {
-                "focus": "모바일 Chrome",
-                "finding": "전체 트래픽의 절반을 차지하지만 이탈률이 높습니다.",
-                "widget": "device_share",
-                "severity": "High",
-                "share": "≈50%",
-                "insight": "모바일 번들 로딩 지연 여부를 먼저 확인하세요.",
-            },
-            {
-                "focus": "Desktop Safari",
-                "finding": "세션 규모는 작지만 전환 저하에 기여합니다.",
-                "widget": "browser_share",
-                "severity": "Medium",
-                "share": "≈12%",
-                "insight": "브라우저 호환성 오류 로그를 확인하세요.",
-            },
-        ],
-        "page_issues": [
-            {
-                "page": top_path,
-                "issue": "체류 시간이 짧고 이탈률이 높습니다.",
-                "dwell_time": dwell_text,
-                "exit_rate": exit_text,
-                "insight": "CTA 위계를 단순화하고 핵심 콘텐츠를 상단에 배치하세요.",
-                "widget": "time_top_pages",
-            }
-        ],
-        "interaction_insights": [
-            {
-                "area": heatmap_area,
-                "insight": "히트맵 상위 버튼이 전체 클릭의 60% 이상을 차지합니다.",
-                "action": "서브 CTA를 축소하고 터치 영역을 넓혀 클릭 미스를 줄이세요.",
-                "widget": "top_buttons_by_path",
-            }
-        ],
-        "ux_recommendations": [
-            {
-                "category": "UX",
-                "suggestion": "결제 페이지 요약 영역을 상단으로 올리고 버튼 대비를 강화합니다.",
-                "rationale": "상위 페이지 중 결제 단계 체류 시간이 가장 짧습니다.",
-                "validation": "time_top_pages 위젯으로 7일간 평균 체류 시간을 추적",
-            }
-        ],
-        "tech_recommendations": [
-            {
-                "category": "Tech",
-                "suggestion": "모바일 번들을 분할하고 이미지 lazy-load를 적용합니다.",
-                "rationale": "모바일 Chrome 로그 대비 이탈률이 커서 로딩 병목이 의심됩니다.",
-                "validation": "daily_count·device_share 지표와 LCP 계측을 비교",
-            }
-        ],
-        "priorities": [
-            {
-                "title": "모바일 Chrome 로딩 속도 개선",
-                "priority": "High",
-                "impact": "이탈률 10%p 감소 시 전환율 +5% 기대",
-                "effort": "Medium",
-                "expected_metric_change": {"metric": "page_exit_rate", "period": "7d", "target": "-10%"},
-                "business_outcome": "모바일 매출 손실 방지",
-            },
-            {
-                "title": "결제 CTA 시각적 위계 정비",
-                "priority": "Medium",
-                "impact": "체류시간 +15% 기대",
-                "effort": "Low",
-                "expected_metric_change": {"metric": "avg_time_on_page", "period": "7d", "target": "+15%"},
-                "business_outcome": "완료율 +3% 예상",
-            },
-        ],
-        "metrics_to_track": [
-            {
-                "metric": "page_exit_rate",
-                "widget": "page_exit_rate",
-                "reason": "이탈 감소 여부 확인",
-                "target_change": "-10%",
-                "timeframe": "7d",
-            },
-            {
-                "metric": "time_on_page",
-                "widget": "time_top_pages",
-                "reason": "UX 개선 검증",
-                "target_change": "+15%",
-                "timeframe": "7d",
-            },
-        ],
-        "predictions": [
-            {"metric": "전환율", "baseline": 2.3, "expected": 2.8, "unit": "%", "narrative": "모바일 이탈 10%p 감소 시"},
-            {"metric": "일일 로그 수", "baseline": 1800, "expected": 1950, "unit": "sessions", "narrative": "유입 부족 보완"},
-        ],
-        "radar_scores": [
-            {"axis": "performance", "score": 58, "commentary": "모바일 번들 최적화 필요"},
-            {"axis": "experience", "score": 62, "commentary": "CTA 집중도가 높아 혼선 발생"},
-            {"axis": "growth", "score": 54, "commentary": "일일 로그 상승이 정체됨"},
-            {"axis": "search", "score": 66, "commentary": "검색 유입은 안정적"},
-            {"axis": "stability", "score": 70, "commentary": "오류 로그는 낮음"},
-        ],
-        "meta": {"mode": "fallback", "prompt_version": "v2", "source": "router_scan"},
+        "page_issues": [{**_FALLBACK_PAGE_ISSUE, "page": top_path, "dwell_time": dwell_text, "exit_rate": exit_text}],
+        "interaction_insights": [{**_FALLBACK_INTERACTION, "area": heatmap_area}],
+        # _finalize_report mutates meta, so every report gets its own
+        "meta": dict(_FALLBACK_TEMPLATE["meta"]),
     }
-    return report
 
 
 def _finalize_report(payload: Dict[str, Any], mode: str) -> Dict[str, Any]:
@@ -810,7 +1493,7 @@ def _finalize_report(payload: Dict[str, Any], mode: str) -> Dict[str, Any]:
     return ReportResponse(**payload).model_dump()
 
 
-def generate_report(
+async def generate_report(
     from_ts: Optional[str],
     to_ts: Optional[str],
     bucket: str,
@@ -821,29 +1504,42 @@ def generate_report(
     audience: str,
     word_limit: int,
 ) -> Dict[str, Any]:
+    key = None
+    if AI_REPORT_RESULT_TTL > 0:
+        key = _report_cache_key(from_ts, to_ts, bucket, site_id, language, audience, word_limit, prompt=prompt)
+        cached = _REPORT_CACHE.get(key)
+        if cached is not None:
+            return dict(cached)
     del from_ts, to_ts, bucket, site_id  # Inputs are handled via widget bundle collection.
-    bundle = _collect_widget_data()
+    warmup = asyncio.create_task(_prewarm_llm_connection())
+    try:
+        bundle = _clamp_bundle_for_prompt(await _cached_widget_data())
+        await warmup
+    finally:
+        # Collection failed or the request was cancelled: don't orphan the prewarm
+        if not warmup.done():
+            warmup.cancel()
     messages = _build_messages(bundle, prompt, language, audience, word_limit)
-    provider = _resolved_provider()
 
     try:
-        if provider in {"", "disabled", "none"}:
-            raise RuntimeError("LLM disabled")
-        if provider in {"openai", "openai_compat", "vllm"}:
-            content = _call_openai_compatible(messages)
-        else:
-            content = _call_ollama_resilient(messages)
+        content = await _call_llm(messages)
 
-        log.debug("ai-report raw LLM response: %s", (content[:500] + "...") if isinstance(content, str) and len(content) > 500 else content)
+        # Snippets are only built when the record will actually be emitted
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ai-report raw LLM response: %s", _safe_snippet(content, 500))
         data = _extract_json(content)
         if not isinstance(data, dict) or not data:
-            log.warning("LLM returned invalid JSON, attempting repair. snippet=%s", _safe_snippet(content))
-            repaired = _retry_llm_for_json(messages, content)
+            if log.isEnabledFor(logging.WARNING):
+                log.warning("LLM returned invalid JSON, attempting repair. snippet=%s", _safe_snippet(content))
+            repaired = await _retry_llm_for_json(messages, content)
             if repaired:
                 data = _extract_json(repaired)
         if not isinstance(data, dict) or not data:
             raise ValueError("invalid JSON from LLM")
-        return _finalize_report(data, mode="llm")
+        report = _finalize_report(data, mode="llm")
+        if key is not None:
+            _REPORT_CACHE[key] = report
+        return dict(report)
     except Exception as exc:
         log.warning("LLM failed, using fallback: %s", exc)
         fallback = _fallback_report(bundle)
@@ -855,7 +1551,7 @@ def _safe_snippet(text: Any, limit: int = 1200) -> str:
         text = text.decode("utf-8", "replace")
     elif not isinstance(text, str):
         try:
-            text = json.dumps(text, ensure_ascii=False)
+            text = _dumps_bytes(text).decode()
         except Exception:
             text = str(text)
     sanitized = (text or "").replace("\r", "\\r").replace("\n", "\\n")
@@ -0,0 +1,59 @@
+import types
+
+from plugins.widgets.ai_insights import service
+
+
+class _DownRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise ConnectionError("redis unreachable")
+
+    def set(self, key, value, px=None):
+        self.calls += 1
+        raise ConnectionError("redis unreachable")
+
+
+def test_redis_outage_backs_off_l2(monkeypatch):
+    now = [100.0]
+    fake = _DownRedis()
+    monkeypatch.setattr(service, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(service, "_redis", fake)
+    monkeypatch.setattr(service, "_l2_down_until", 0.0)
+
+    assert service._l2_get("k") is None
+    assert fake.calls == 1
+
+    # Within the backoff window neither reads nor writes touch Redis
+    assert service._l2_get("k") is None
+    service._l2_set("k", {"a": 1})
+    assert fake.calls == 1
+
+    now[0] += service._L2_BACKOFF_S + 1
+    assert service._l2_get("k") is None
+    assert fake.calls == 2
+
+
+def test_missing_redis_package_warns_once(monkeypatch, caplog):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_redis(name, *args, **kwargs):
+        if name == "redis":
+            raise ImportError("No module named 'redis'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_redis)
+    monkeypatch.setattr(service, "_redis", None)
+    monkeypatch.setattr(service, "_l2_down_until", 0.0)
+
+    with caplog.at_level("WARNING", logger=service.log.name):
+        assert service._l2() is None
+        assert service._l2() is None
+        assert service._l2_get("k") is None
+
+    warnings = [r for r in caplog.records if "redis package is not installed" in r.getMessage()]
+    assert len(warnings) == 1
@@ -0,0 +1,47 @@
+import asyncio
+
+from plugins.widgets.ai_insights import explain_service
+
+
+def test_http_client_is_recreated_after_close():
+    async def lifespan_cycle():
+        client = explain_service._get_http()
+        assert explain_service._get_http() is client
+        await explain_service.aclose_http_client()
+        assert client.is_closed
+        return client
+
+    first = asyncio.run(lifespan_cycle())
+    second = asyncio.run(lifespan_cycle())
+    assert second is not first
+    assert explain_service._http is None
+
+
+def test_cache_key_depends_on_context():
+    base = {"time_window": {"bucket": "1h"}, "totals": {"views": 10}}
+    site_a = dict(base, context={"site_id": "a", "filters": {}})
+    site_b = dict(base, context={"site_id": "b", "filters": {}})
+
+    def key(digest):
+        return explain_service._cache_key(digest, "ko", 300, "dev")
+
+    assert key(site_a) != key(site_b)
+    assert key(site_a) == key(dict(site_a, version="2"))
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    from cachetools import TTLCache
+
+    monkeypatch.setattr(explain_service, "EXPLAIN_CACHE_TTL_S", 60.0)
+    monkeypatch.setattr(explain_service, "_cache", TTLCache(maxsize=2, ttl=60.0))
+    explain_service._cache_set("a", {"n": 1})
+    explain_service._cache_set("b", {"n": 2})
+    # A hit on "a" keeps it; "b" is now the least recently used entry
+    assert explain_service._cache_get("a") == {"n": 1}
+    explain_service._cache_set("c", {"n": 3})
+    assert explain_service._cache_get("b") is None
+    # Overwriting refreshes recency too
+    explain_service._cache_set("a", {"n": 4})
+    explain_service._cache_set("d", {"n": 5})
+    assert explain_service._cache_get("a") == {"n": 4}
+    assert explain_service._cache_get("c") is None
@@ -0,0 +1,189 @@
+import asyncio
+import types
+
+from plugins.widgets.ai_report import service
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _tripped(monkeypatch, url):
+    clock = _Clock()
+    # Only the breaker reads the module clock here; asyncio keeps the real one
+    monkeypatch.setattr(service, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    breaker = service._Breaker(fail_threshold=2, reset_after=30.0)
+    breaker.record_failure(url)
+    breaker.record_failure(url)
+    return breaker, clock
+
+
+def test_is_open_is_read_only(monkeypatch):
+    breaker, clock = _tripped(monkeypatch, "u")
+    assert breaker.is_open("u")
+    assert not breaker.try_acquire("u")
+
+    clock.now += 31
+    # Checking repeatedly must not consume the half-open probe
+    assert not breaker.is_open("u")
+    assert not breaker.is_open("u")
+    assert breaker.try_acquire("u")
+    assert not breaker.try_acquire("u")
+
+
+def test_failed_probe_reopens(monkeypatch):
+    breaker, clock = _tripped(monkeypatch, "u")
+    clock.now += 31
+    assert breaker.try_acquire("u")
+    breaker.record_failure("u")
+    assert breaker.is_open("u")
+    assert not breaker.try_acquire("u")
+
+
+def test_openai_circuit_recovers_with_one_real_call(monkeypatch):
+    url = service._OPENAI_CHAT_URL
+    breaker, clock = _tripped(monkeypatch, url)
+    calls = []
+
+    async def fake_stream(*args, **kwargs):
+        calls.append(args[0])
+        await asyncio.sleep(0)
+        return '{"ok": true}'
+
+    monkeypatch.setattr(service, "_breaker", breaker)
+    monkeypatch.setattr(service, "_stream_chat", fake_stream)
+    monkeypatch.setattr(service, "AI_REPORT_LLM_API_KEY", "k")
+    messages = [{"role": "user", "content": "x"}]
+
+    async def burst():
+        return await asyncio.gather(
+            *(service._call_openai_compatible(messages) for _ in range(3)), return_exceptions=True
+        )
+
+    # Open: nothing goes out
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(burst()))
+    assert calls == []
+
+    clock.now += 31
+    results = asyncio.run(burst())
+    assert calls == [url]
+    assert sum(r == '{"ok": true}' for r in results) == 1
+
+    # The successful probe closed the circuit
+    assert not breaker.is_open(url)
+    assert asyncio.run(service._call_openai_compatible(messages)) == '{"ok": true}'
+    assert len(calls) == 2
+
+
+def test_prewarm_leaves_the_probe_for_the_report(monkeypatch):
+    url = service._OPENAI_CHAT_URL
+    breaker, clock = _tripped(monkeypatch, url)
+    heads, posts = [], []
+
+    class _Client:
+        async def head(self, probe, timeout=None):
+            heads.append(probe)
+
+    async def fake_stream(*args, **kwargs):
+        posts.append(args[0])
+        return "{}"
+
+    monkeypatch.setattr(service, "_breaker", breaker)
+    monkeypatch.setattr(service, "_get_http", lambda: _Client())
+    monkeypatch.setattr(service, "_resolved_provider", lambda: "openai")
+    monkeypatch.setattr(service, "_stream_chat", fake_stream)
+    monkeypatch.setattr(service, "AI_REPORT_LLM_API_KEY", "k")
+
+    async def report_cycle():
+        await service._prewarm_llm_connection()
+        return await service._call_openai_compatible([{"role": "user", "content": "x"}])
+
+    clock.now += 31
+    assert asyncio.run(report_cycle()) == "{}"
+    assert heads == [url]
+    assert posts == [url]
+    assert not breaker.is_open(url)
+
+
+def test_reopened_ollama_host_is_retried_after_cooldown(monkeypatch):
+    bases = ("http://a:1", "http://b:1")
+    breaker, clock = _tripped(monkeypatch, bases[0] + "/api/chat")
+    breaker.record_failure(bases[1] + "/api/chat")
+    breaker.record_failure(bases[1] + "/api/chat")
+    heads, chats = [], []
+
+    class _Client:
+        async def head(self, probe, timeout=None):
+            heads.append(probe)
+
+    async def fake_chat(base, json_mode, messages):
+        chats.append(base)
+        return '{"a": 1}'
+
+    monkeypatch.setattr(service, "_breaker", breaker)
+    monkeypatch.setattr(service, "_get_http", lambda: _Client())
+    monkeypatch.setattr(service, "_ollama_chat", fake_chat)
+    monkeypatch.setattr(service, "_OLLAMA_CANDIDATES", bases)
+    monkeypatch.setattr(service, "_ollama_good", None)
+
+    clock.now += 31
+    assert asyncio.run(service._call_ollama_resilient([])) == '{"a": 1}'
+    assert len(heads) == 2
+    assert len(chats) == 1
+    assert not breaker.is_open(chats[0] + "/api/chat")
+
+
+def test_remembered_ollama_host_failure_is_recorded(monkeypatch):
+    bases = ("http://a:1", "http://b:1")
+    clock = _Clock()
+    monkeypatch.setattr(service, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    breaker = service._Breaker(fail_threshold=1, reset_after=30.0)
+    chats = []
+
+    class _Client:
+        async def head(self, probe, timeout=None):
+            if "a:1" in probe:
+                raise OSError("down")
+
+    async def fake_chat(base, json_mode, messages):
+        chats.append(base)
+        if base == bases[0]:
+            raise OSError("down")
+        return '{"a": 1}'
+
+    monkeypatch.setattr(service, "_breaker", breaker)
+    monkeypatch.setattr(service, "_get_http", lambda: _Client())
+    monkeypatch.setattr(service, "_ollama_chat", fake_chat)
+    monkeypatch.setattr(service, "_OLLAMA_CANDIDATES", bases)
+    monkeypatch.setattr(service, "_ollama_good", (bases[0], True))
+
+    assert asyncio.run(service._call_ollama_resilient([])) == '{"a": 1}'
+    # The remembered host was tried once, its failure opened its circuit,
+    # and the loop went straight to the other host
+    assert chats == [bases[0], bases[1]]
+    assert breaker.is_open(bases[0] + "/api/chat")
+    assert service._ollama_good == (bases[1], True)
+
+
+def test_remembered_ollama_host_recovers_after_cooldown(monkeypatch):
+    bases = ("http://a:1",)
+    breaker, clock = _tripped(monkeypatch, bases[0] + "/api/chat")
+    chats = []
+
+    async def fake_chat(base, json_mode, messages):
+        chats.append(base)
+        return '{"a": 1}'
+
+    monkeypatch.setattr(service, "_breaker", breaker)
+    monkeypatch.setattr(service, "_ollama_chat", fake_chat)
+    monkeypatch.setattr(service, "_OLLAMA_CANDIDATES", bases)
+    monkeypatch.setattr(service, "_ollama_good", (bases[0], True))
+
+    clock.now += 31
+    assert asyncio.run(service._call_ollama_resilient([])) == '{"a": 1}'
+    assert chats == [bases[0]]
+    assert not breaker.is_open(bases[0] + "/api/chat")
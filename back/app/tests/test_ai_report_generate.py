@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from plugins.widgets.ai_report import service
+
+
+def _run(**overrides):
+    kwargs = dict(prompt="p", language="ko", audience="pm", word_limit=100)
+    kwargs.update(overrides)
+    return service.generate_report(None, None, "1h", None, **kwargs)
+
+
+def test_failed_collection_cancels_prewarm(monkeypatch):
+    state = {}
+
+    async def slow_prewarm():
+        state["started"] = True
+        await asyncio.sleep(3600)
+
+    async def broken_bundle():
+        await asyncio.sleep(0)
+        raise RuntimeError("collect failed")
+
+    monkeypatch.setattr(service, "AI_REPORT_RESULT_TTL", 0)
+    monkeypatch.setattr(service, "_prewarm_llm_connection", slow_prewarm)
+    monkeypatch.setattr(service, "_cached_widget_data", broken_bundle)
+
+    async def main():
+        with pytest.raises(RuntimeError, match="collect failed"):
+            await _run()
+        await asyncio.sleep(0)
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(main()) == []
+    assert state["started"]
+
+
+def test_identical_request_reuses_report_until_ttl(monkeypatch):
+    from cachetools import TTLCache
+
+    now = [0.0]
+    calls = []
+
+    async def fake_llm(messages):
+        calls.append(messages)
+        return '{"title": "t", "summary": "s"}'
+
+    async def no_prewarm():
+        return None
+
+    async def bundle():
+        return {"_meta": {"base": "http://x"}}
+
+    monkeypatch.setattr(service, "AI_REPORT_RESULT_TTL", 300.0)
+    monkeypatch.setattr(service, "_REPORT_CACHE", TTLCache(maxsize=8, ttl=300.0, timer=lambda: now[0]))
+    monkeypatch.setattr(service, "_call_llm", fake_llm)
+    monkeypatch.setattr(service, "_prewarm_llm_connection", no_prewarm)
+    monkeypatch.setattr(service, "_cached_widget_data", bundle)
+
+    first = asyncio.run(_run())
+    now[0] = 299.0
+    second = asyncio.run(_run())
+    assert len(calls) == 1
+    assert second == first
+
+    # A different prompt is a different key
+    asyncio.run(_run(prompt="other"))
+    assert len(calls) == 2
+
+    now[0] = 301.0
+    asyncio.run(_run())
+    assert len(calls) == 3
+
+
+def test_fallback_reports_are_not_cached(monkeypatch):
+    from cachetools import TTLCache
+
+    calls = []
+
+    async def failing_llm(messages):
+        calls.append(messages)
+        raise RuntimeError("llm down")
+
+    async def no_prewarm():
+        return None
+
+    async def bundle():
+        return {"_meta": {"base": "http://x"}}
+
+    monkeypatch.setattr(service, "AI_REPORT_RESULT_TTL", 300.0)
+    monkeypatch.setattr(service, "_REPORT_CACHE", TTLCache(maxsize=8, ttl=300.0))
+    monkeypatch.setattr(service, "_call_llm", failing_llm)
+    monkeypatch.setattr(service, "_prewarm_llm_connection", no_prewarm)
+    monkeypatch.setattr(service, "_cached_widget_data", bundle)
+
+    asyncio.run(_run())
+    asyncio.run(_run())
+    assert len(calls) == 2
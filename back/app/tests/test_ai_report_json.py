@@ -0,0 +1,15 @@
+from plugins.widgets.ai_report.service import _extract_json
+
+
+def test_valid_json_is_not_rewritten():
+    assert _extract_json('{"a": "x,]"}') == {"a": "x,]"}
+    assert _extract_json('{"a": "NaN or Infinity, }"}') == {"a": "NaN or Infinity, }"}
+
+
+def test_repairs_apply_outside_strings_only():
+    text = '```json\n{"a": NaN, "b": -Infinity, "c": [1, 2,], "d": "x,]",}\n```'
+    assert _extract_json(text) == {"a": None, "b": None, "c": [1, 2], "d": "x,]"}
+
+
+def test_bare_constants_decode_to_none():
+    assert _extract_json('Sure: {"a": NaN} done') == {"a": None}
@@ -0,0 +1,36 @@
+import os
+import time
+
+from plugins.widgets.ai_report import _llm_cache
+
+
+def _use_dir(monkeypatch, tmp_path, ttl=3600.0, max_files=3):
+    monkeypatch.setattr(_llm_cache, "_DIR", tmp_path)
+    monkeypatch.setattr(_llm_cache, "_TTL", ttl)
+    monkeypatch.setattr(_llm_cache, "_MAX_FILES", max_files)
+
+
+def _age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_expired_reply_is_a_miss_and_pruned_on_write(monkeypatch, tmp_path):
+    _use_dir(monkeypatch, tmp_path)
+    _llm_cache.put("old", "stale")
+    _age(tmp_path / "old.json", 7200)
+    assert _llm_cache.get("old") is None
+
+    _llm_cache.put("new", "fresh")
+    assert _llm_cache.get("new") == "fresh"
+    assert not (tmp_path / "old.json").exists()
+
+
+def test_write_caps_file_count_dropping_oldest(monkeypatch, tmp_path):
+    _use_dir(monkeypatch, tmp_path)
+    for i, key in enumerate(["a", "b", "c"]):
+        _llm_cache.put(key, key)
+        _age(tmp_path / f"{key}.json", 100 - i)
+    _llm_cache.put("d", "d")
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.json", "c.json", "d.json"]
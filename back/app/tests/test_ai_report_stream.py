@@ -0,0 +1,28 @@
+from plugins.widgets.ai_report.service import _ObjectCloseDetector
+
+
+def _first_close(chunks):
+    detector = _ObjectCloseDetector()
+    seen = ""
+    for chunk in chunks:
+        seen += chunk
+        if detector.feed(chunk):
+            return seen
+    return None
+
+
+def test_stops_after_first_json_object():
+    assert _first_close(['{"a": ', '"}{"', '}', ' trailing', ' more']) == '{"a": "}{"}'
+
+
+def test_skips_brace_wrapped_prose_before_object():
+    chunks = ["Note: {exa", "mple} ", '{"a"', ":1}", " tail"]
+    assert _first_close(chunks) == 'Note: {example} {"a":1}'
+
+
+def test_escaped_quote_split_across_chunks():
+    assert _first_close(['{"a": "x\\', '"}"', "}"]) == '{"a": "x\\"}"}'
+
+
+def test_unclosed_object_never_stops():
+    assert _first_close(["{example}", '{"a": 1']) is None
@@ -0,0 +1,49 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# ingest.influx builds its Influx client at import time
+pytest.importorskip("influxdb_client_3")
+
+from ingest import router as ingest_router  # noqa: E402
+
+
+def test_ndjson_reports_rejected_lines(monkeypatch, caplog):
+    written = []
+    monkeypatch.setattr(ingest_router, "write_events", lambda batch: written.extend(batch))
+    app = FastAPI()
+    app.include_router(ingest_router.router)
+
+    body = b'{"a": 1}\nnot json\n[1, 2]\n\n{"b": 2}\n{broken'
+    with caplog.at_level("WARNING", logger="ingest"):
+        resp = TestClient(app).post(
+            "/api/ingest/events", content=body, headers={"content-type": "application/x-ndjson"}
+        )
+
+    assert resp.status_code == 200
+    assert resp.json() == {"ok": True, "received": 2, "rejected": 3}
+    assert written == [{"a": 1}, {"b": 2}]
+    assert "rejected 3" in caplog.text
+
+
+def test_ndjson_rejects_overlong_lines(monkeypatch):
+    written = []
+    monkeypatch.setattr(ingest_router, "write_events", lambda batch: written.extend(batch))
+    monkeypatch.setattr(ingest_router, "NDJSON_MAX_LINE_BYTES", 32)
+    app = FastAPI()
+    app.include_router(ingest_router.router)
+
+    def body():
+        yield b'{"a": 1}\n{"pad": "'
+        # The overlong line spans several chunks before its newline arrives
+        for _ in range(4):
+            yield b"x" * 20
+        yield b'"}\n{"b": 2}\n{"c": "' + b"y" * 40 + b'"}\n{"d"'
+        yield b": 4}"
+
+    resp = TestClient(app).post(
+        "/api/ingest/events", content=body(), headers={"content-type": "application/x-ndjson"}
+    )
+
+    assert resp.json() == {"ok": True, "received": 3, "rejected": 2}
+    assert written == [{"a": 1}, {"b": 2}, {"d": 4}]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Widget services import the Influx client at module level
+pytest.importorskip("influxdb_client_3")
+
+from plugins import router as plugins_router  # noqa: E402
+from plugins.widgets.daily_count import router as daily_count_router  # noqa: E402
+
+
+def test_widget_routes_are_indexed_through_included_routers():
+    assert "/daily-count" in plugins_router._GET_ENDPOINTS
+    paths = [path for path, _ in plugins_router.iter_get_routes(plugins_router.router)]
+    assert "/api/query/daily-count" in paths
+
+
+def test_bundle_returns_daily_count_payload(monkeypatch):
+    seen = {}
+
+    def fake_query(days):
+        seen["days"] = days
+        return [{"date": "2026-01-01", "count": 3}]
+
+    monkeypatch.setattr(daily_count_router, "query_daily_counts", fake_query)
+    app = FastAPI()
+    app.include_router(plugins_router.router)
+
+    resp = TestClient(app).get("/api/query/bundle", params={"widgets": "/daily-count,/nope"})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["widgets"] == {"/daily-count": {"rows": [{"date": "2026-01-01", "count": 3}]}}
+    assert body["errors"] == {"/nope": "unsupported"}
+    # Declared default range="7d"
+    assert seen["days"] == 7
+
+
+def test_ai_report_discovers_widget_endpoints():
+    from plugins.widgets.ai_report import service
+
+    discovered = service._discover_query_endpoints(plugins_router.router)
+    assert "/api/query/daily-count" in discovered
+    assert "/api/query/bundle" in discovered
@@ -0,0 +1,32 @@
+"""Generate the widget router manifest used by `plugins.router`.
+위젯 라우터 매니페스트(`plugins/_widgets_manifest.py`)를 생성합니다.
+
+Run from `back/app` (the Docker image does this at build time):
+    python tools/gen_widgets.py
+"""
+
+from pathlib import Path
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+WIDGETS_DIR = APP_ROOT / "plugins" / "widgets"
+MANIFEST = APP_ROOT / "plugins" / "_widgets_manifest.py"
+
+
+def main() -> None:
+    # Same selection as the runtime scan: packages that ship a router.py
+    names = sorted(
+        p.name
+        for p in WIDGETS_DIR.iterdir()
+        if (p / "__init__.py").is_file() and (p / "router.py").is_file()
+    )
+    body = "".join(f'    "{name}",\n' for name in names)
+    MANIFEST.write_text(
+        '"""Generated by tools/gen_widgets.py. Do not edit."""\n\n'
+        f"WIDGETS = (\n{body})\n",
+        encoding="utf-8",
+    )
+    print(f"wrote {MANIFEST.relative_to(APP_ROOT)} ({len(names)} widgets)")
+
+
+if __name__ == "__main__":
+    main()